@@ -0,0 +1,86 @@
+"""Сравнение представлений состояний PersistentMap на смешанной по размеру нагрузке.
+
+Большинство ассоциативных массивов содержат несколько ключей, а несколько - тысячи.
+Для каждого представления ('dict', 'flat', 'adaptive') измеряются время записи и чтения
+и объем памяти, занятой только историей версий: состояниями версий и их ключами
+и значениями (каждый объект учитывается один раз), отдельно для небольших и крупных
+массивов. Индекс изменений ключей и хеши версий одинаковы для всех представлений
+и не учитываются.
+
+Запуск: python -m benchmarks.bench_map_storage
+"""
+import random
+import sys
+import time
+
+from persistent_data_structures import FlatMap, PersistentMap
+
+SMALL_MAPS = 2000
+SMALL_KEYS = 8
+LARGE_MAPS = 2
+LARGE_KEYS = 2000
+WRITES_PER_MAP = 20
+READS_PER_MAP = 200
+
+
+def run(storage: str) -> tuple:
+    """Выполняет нагрузку для указанного представления.
+
+    :param storage: Представление состояний версий.
+    :return: Время записи, время чтения (в секундах) и объем истории версий небольших
+        и крупных массивов (в байтах).
+    """
+    rng = random.Random(0)
+    sizes = [SMALL_KEYS] * SMALL_MAPS + [LARGE_KEYS] * LARGE_MAPS
+    start = time.perf_counter()
+    maps = []
+    for size in sizes:
+        persistent_map = PersistentMap({f'key{i}': i for i in range(size)}, storage=storage)
+        for _ in range(WRITES_PER_MAP):
+            persistent_map[f'key{rng.randrange(size)}'] = rng.random()
+        maps.append((persistent_map, size))
+    write_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for persistent_map, size in maps:
+        for _ in range(READS_PER_MAP):
+            persistent_map[f'key{rng.randrange(size)}']
+    read_time = time.perf_counter() - start
+    seen = set()
+    small = sum(history_size_of(persistent_map, seen)
+                for persistent_map, size in maps if size == SMALL_KEYS)
+    large = sum(history_size_of(persistent_map, seen)
+                for persistent_map, size in maps if size == LARGE_KEYS)
+    return write_time, read_time, small, large
+
+
+def history_size_of(persistent_map: PersistentMap, seen: set) -> int:
+    """Возвращает объем состояний версий вместе с их ключами и значениями.
+
+    :param persistent_map: Ассоциативный массив.
+    :param seen: Идентификаторы уже учтенных объектов.
+    :return: Объем в байтах.
+    """
+    size = 0
+    for state in persistent_map._history.values():
+        objects = [state, *state.keys(), *state.values()]
+        if isinstance(state, FlatMap):
+            objects.append(state._items)
+        for obj in objects:
+            if id(obj) not in seen:
+                seen.add(id(obj))
+                size += sys.getsizeof(obj)
+    return size
+
+
+def main() -> None:
+    """Печатает результаты измерений для всех представлений."""
+    print(f'{"storage":>10} {"write, s":>10} {"read, s":>10} '
+          f'{"small, MiB":>11} {"large, MiB":>11}')
+    for storage in PersistentMap.STORAGES:
+        write_time, read_time, small, large = run(storage)
+        print(f'{storage:>10} {write_time:>10.3f} {read_time:>10.3f} '
+              f'{small / 2 ** 20:>11.1f} {large / 2 ** 20:>11.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Пропускная способность записи ShardedPersistentMap в зависимости от числа шардов.
+
+Несколько потоков одновременно записывают ключи в общий ассоциативный массив.
+Для каждого количества шардов печатается число записей в секунду при записи из THREADS
+потоков и те же записи, выполненные одним потоком. Однопоточный столбец показывает выигрыш
+только от копирования меньших шардов, отношение столбцов - влияние конкурентной записи.
+
+В сборках CPython с GIL потоки не выполняют байткод параллельно, и рост пропускной
+способности объясняется в основном тем, что каждая запись копирует только свой шард
+(в n раз меньше данных) и реже ждет блокировку. В сборках без GIL (free-threaded)
+к этому добавляется параллельное выполнение записей в разные шарды.
+
+Запуск: python -m benchmarks.bench_sharded_map
+"""
+import threading
+import time
+
+from persistent_data_structures import ShardedPersistentMap
+
+THREADS = 8
+WRITES_PER_THREAD = 500
+INITIAL_KEYS = 2000
+SHARD_COUNTS = (1, 2, 4, 8, 16)
+
+
+def run(shards: int, threads_count: int = THREADS) -> float:
+    """Выполняет запись для указанного количества шардов.
+
+    :param shards: Количество шардов.
+    :param threads_count: Количество потоков, между которыми делятся записи.
+    :return: Количество записей в секунду.
+    """
+    sharded_map = ShardedPersistentMap({f'key{i}': i for i in range(INITIAL_KEYS)}, shards=shards)
+    barrier = threading.Barrier(threads_count + 1)
+
+    def write(first: int) -> None:
+        barrier.wait()
+        for thread in range(first, THREADS, threads_count):
+            for i in range(WRITES_PER_THREAD):
+                sharded_map[f'key{(thread * WRITES_PER_THREAD + i) % INITIAL_KEYS}'] = i
+
+    threads = [threading.Thread(target=write, args=(first,)) for first in range(threads_count)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return THREADS * WRITES_PER_THREAD / (time.perf_counter() - start)
+
+
+def main() -> None:
+    """Печатает пропускную способность записи для всех количеств шардов."""
+    print(f'{"shards":>6} {f"{THREADS} threads":>12} {"1 thread":>12}')
+    for shards in SHARD_COUNTS:
+        print(f'{shards:>6} {run(shards):>12.0f} {run(shards, 1):>12.0f}')
+
+
+if __name__ == '__main__':
+    main()
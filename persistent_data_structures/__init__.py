@@ -1,5 +1,9 @@
+from .journal import Journal
 from .persistent_array import PersistentArray
 from .persistent_list import PersistentLinkedList
-from .persistent_map import PersistentMap
+from .persistent_map import DELETED, FlatMap, PersistentMap
+from .sharded_map import ShardedPersistentMap
+from .tiered_history import TieredHistory
 
-__all__ = ['PersistentArray', 'PersistentLinkedList', 'PersistentMap']
+__all__ = ['DELETED', 'FlatMap', 'Journal', 'PersistentArray', 'PersistentLinkedList',
+           'PersistentMap', 'ShardedPersistentMap', 'TieredHistory']
@@ -1,5 +1,98 @@
+import hashlib
+import pickle
+from collections.abc import Mapping
 from copy import deepcopy
 
+from persistent_data_structures.tiered_history import TieredHistory, estimate_size
+
+HASH_MODULUS = (1 << 127) - 1
+HASH_BASE = 1_000_003
+HASH_BYTES = 16
+
+
+def _digest(tag: bytes, data: bytes) -> int:
+    """Возвращает 128-битный хеш BLAKE2b данных с тегом типа в диапазоне [1, HASH_MODULUS - 1]."""
+    digest = hashlib.blake2b(data, digest_size=HASH_BYTES, person=tag).digest()
+    return int.from_bytes(digest, 'little') % (HASH_MODULUS - 1) + 1
+
+
+def _encode(hashes) -> bytes:
+    """Кодирует последовательность хешей в байты."""
+    return b''.join(item.to_bytes(HASH_BYTES, 'little') for item in hashes)
+
+
+def hash_value(value: any) -> int:
+    """Возвращает хеш значения в диапазоне [1, HASH_MODULUS - 1].
+
+    Хеш вычисляется функцией BLAKE2b по каноническому представлению значения, поэтому
+    он одинаков во всех процессах, а совпадение хешей неравных значений практически
+    невозможно. Равные числа разных типов (1, 1.0, True, скаляры NumPy) имеют равные хеши,
+    хеши словарей и множеств не зависят от порядка элементов. Значения других типов
+    хешируются по их сериализации через pickle, а если она невозможна - через hash()
+    или, для нехешируемых значений, по идентификатору объекта.
+    :param value: Значение.
+    :return: Хеш значения.
+    """
+    if hasattr(value, 'tolist'):
+        value = value.tolist()
+    if isinstance(value, complex) and not value.imag:
+        value = value.real
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if value is None:
+        return _digest(b'none', b'')
+    if isinstance(value, int):
+        return _digest(b'int', str(int(value)).encode())
+    if isinstance(value, float):
+        return _digest(b'float', value.hex().encode())
+    if isinstance(value, complex):
+        return _digest(b'complex', repr(value).encode())
+    if isinstance(value, str):
+        return _digest(b'str', value.encode('utf-8', 'surrogatepass'))
+    if isinstance(value, (bytes, bytearray)):
+        return _digest(b'bytes', bytes(value))
+    if isinstance(value, tuple):
+        return _digest(b'tuple', _encode(hash_value(item) for item in value))
+    if isinstance(value, list):
+        return _digest(b'list', _encode(hash_value(item) for item in value))
+    if isinstance(value, Mapping):
+        total = sum(hash_pair(key, item) for key, item in value.items()) % HASH_MODULUS
+        return _digest(b'dict', _encode([total]))
+    if isinstance(value, (set, frozenset)):
+        return _digest(b'set', _encode([sum(hash_value(item) for item in value) % HASH_MODULUS]))
+    try:
+        return _digest(b'object', pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        pass
+    try:
+        return _digest(b'hash', str(hash(value)).encode())
+    except TypeError:
+        return _digest(b'id', str(id(value)).encode())
+
+
+def hash_pair(key: any, value: any) -> int:
+    """Возвращает хеш пары ключ-значение.
+
+    :param key: Ключ.
+    :param value: Значение.
+    :return: Хеш пары.
+    """
+    return _digest(b'pair', _encode([hash_value(key), hash_value(value)]))
+
+
+def hash_sequence(values) -> int:
+    """Возвращает полиномиальный хеш последовательности: сумму h(v_i) * B^(i + 1).
+
+    :param values: Последовательность значений.
+    :return: Хеш последовательности.
+    """
+    result = 0
+    power = 1
+    for value in values:
+        power = power * HASH_BASE % HASH_MODULUS
+        result = (result + hash_value(value) * power) % HASH_MODULUS
+    return result
+
 
 class BasePersistent:
     """Базовый класс для персистентных стркутур данных.
@@ -7,7 +100,13 @@ class BasePersistent:
     Каждая персистентная структура будет хранить в себе историю изменений в виде словаря с ключами
     версиями и значениями - состояниями. Также персистентная структура будет хранить номер ткущей
     и номер последней версии.
+
+    Для каждой версии хранится структурный хеш состояния, который обновляется при изменении
+    только для затронутой части состояния. Это позволяет сравнивать версии за O(1) и при
+    включенной дедупликации хранить одинаковые состояния, полученные разными путями, один раз.
     """
+    _journal = None
+
     def __init__(self, initial_state=None) -> None:
         """Инициализирует персистентную структуру данных.
         :param initial_state: Начальное состояние персистентной структуры данных.
@@ -15,6 +114,8 @@ class BasePersistent:
         self._history = {0: initial_state}
         self._current_state = 0
         self._last_state = 0
+        self._hashes = {0: self._compute_hash(initial_state)}
+        self._hash_table = None
 
     def get_version(self, version):
         """Возвращает состояние персистентной структуры данных на указанной версии.
@@ -36,9 +137,196 @@ class BasePersistent:
         if version < 0 or version >= len(self._history):
             raise ValueError(f'Version "{version}" does not exist')
         self._current_state = version
+        self._log('update_version', version)
+
+    def version_hash(self, version: int = None) -> int:
+        """Возвращает структурный хеш состояния указанной версии.
+
+        :param version: Номер версии (по умолчанию текущая версия).
+        :return: Хеш состояния.
+        :raises ValueError: Если указанная версия не существует.
+        """
+        if version is None:
+            version = self._current_state
+        if version < 0 or version >= len(self._history):
+            raise ValueError(f'Version "{version}" does not exist')
+        return self._hashes[version]
+
+    def version_equal(self, first: int, second: int) -> bool:
+        """Сравнивает состояния двух версий по их структурным хешам за O(1).
+
+        Хеши элементов - 128-битные хеши BLAKE2b, поэтому совпадение хешей неравных
+        состояний практически невозможно (вероятность порядка n / 2^127) и состояния
+        поэлементно не сравниваются.
+        :param first: Номер первой версии.
+        :param second: Номер второй версии.
+        :return: True, если состояния версий равны, иначе False.
+        :raises ValueError: Если одна из версий не существует.
+        """
+        return self.version_hash(first) == self.version_hash(second)
+
+    def enable_deduplication(self) -> None:
+        """Включает дедупликацию версий.
+
+        Если новая версия равна одной из уже существующих, она ссылается на состояние
+        существующей версии вместо хранения собственной копии. Версии, вытесненные на диск,
+        не участвуют в дедупликации и остаются на диске.
+        """
+        if self._hash_table is not None:
+            return
+        self._hash_table = {}
+        for version in self._history:
+            if self._in_memory(version):
+                self._deduplicate(version)
+
+    def __eq__(self, other: object) -> bool:
+        """Сравнивает текущие версии двух персистентных структур данных.
+
+        Структуры с разными хешами текущих версий считаются неравными без сравнения состояний.
+        :param other: Другая структура данных.
+        :return: True, если текущие состояния равны, иначе False.
+        """
+        if type(self) is not type(other):
+            return NotImplemented
+        if self.version_hash() != other.version_hash():
+            return False
+        return self._states_equal(self._history[self._current_state],
+                                  other._history[other._current_state])
+
+    __hash__ = None
+
+    def enable_tiered_storage(self, directory: str, **options) -> None:
+        """Включает вытеснение старых версий в сжатые сегменты на диске.
+
+        Обращения к вытесненным версиям через get_version, get и другие методы прозрачно
+        загружают их с диска через ограниченный кеш.
+        :param directory: Директория, в которой создается поддиректория для сегментов.
+        :param options: Параметры TieredHistory (hot_versions, segment_size, cache_size,
+            codec, max_hot_bytes).
+        :raises ValueError: Если многоуровневое хранение уже включено.
+        """
+        if isinstance(self._history, TieredHistory):
+            raise ValueError('Tiered storage is already enabled')
+        self._history = TieredHistory(directory, self._history, sizer=self._state_size, **options)
+
+    def disable_tiered_storage(self) -> None:
+        """Возвращает все версии в память и удаляет сегменты вытесненных версий с диска."""
+        if isinstance(self._history, TieredHistory):
+            history = self._history
+            self._history = {version: history[version] for version in sorted(history)}
+            history.close()
+
+    def storage_stats(self) -> dict | None:
+        """Возвращает метрики многоуровневого хранения истории.
+
+        :return: Метрики TieredHistory.stats() или None, если многоуровневое хранение не включено.
+        """
+        if not isinstance(self._history, TieredHistory):
+            return None
+        return self._history.stats()
+
+    def attach_journal(self, journal) -> None:
+        """Подключает журнал операций к персистентной структуре данных.
+
+        Сразу сохраняет снимок текущего состояния, после чего каждая изменяющая
+        операция записывается в журнал после ее успешного выполнения. Аргументы операции
+        проверяются до создания новой версии, поэтому операция, завершившаяся ошибкой,
+        не изменяет структуру и не записывается в журнал.
+        :param journal: Журнал операций (persistent_data_structures.journal.Journal).
+        """
+        self._journal = journal
+        journal.checkpoint(self)
+
+    def get_journal(self):
+        """Возвращает подключенный журнал операций.
+
+        :return: Журнал операций или None, если журнал не подключен.
+        """
+        return self._journal
+
+    def detach_journal(self) -> None:
+        """Отключает журнал операций от персистентной структуры данных."""
+        self._journal = None
+
+    def __getstate__(self) -> dict:
+        """Возвращает состояние структуры для сериализации без подключенного журнала.
+
+        Хеши версий одинаковы во всех процессах, поэтому сохраняются вместе со структурой,
+        и при загрузке вытесненные на диск версии не читаются.
+        """
+        state = self.__dict__.copy()
+        state.pop('_journal', None)
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        """Восстанавливает структуру после десериализации."""
+        self.__dict__.update(state)
+        if isinstance(self._history, TieredHistory):
+            self._history._sizer = self._state_size
+
+    def _log(self, op: str, *args) -> None:
+        """Записывает успешно выполненную изменяющую операцию в журнал, если он подключен.
+
+        :param op: Имя метода, выполняющего операцию.
+        :param args: Аргументы метода.
+        """
+        if self._journal is not None:
+            self._journal.append(op, args)
 
     def _create_new_state(self) -> None:
         """Создает новую версию."""
         self._last_state += 1
         self._history[self._last_state] = deepcopy(self._history[self._current_state])
+        self._hashes[self._last_state] = self._hashes[self._current_state]
         self._current_state = self._last_state
+
+    def _commit_state(self, state_hash: int) -> None:
+        """Сохраняет хеш последней версии и выполняет ее дедупликацию, если она включена.
+
+        :param state_hash: Хеш состояния последней версии.
+        """
+        self._hashes[self._last_state] = state_hash
+        if self._hash_table is not None:
+            self._deduplicate(self._last_state)
+
+    def _deduplicate(self, version: int) -> None:
+        """Заменяет состояние версии равным ему ранее сохраненным состоянием."""
+        candidates = self._hash_table.setdefault(self._hashes[version], [])
+        for candidate in candidates:
+            if candidate == version:
+                return
+            if not self._in_memory(candidate):
+                continue
+            if self._states_equal(self._history[candidate], self._history[version]):
+                self._history[version] = self._history[candidate]
+                return
+        candidates.append(version)
+
+    def _in_memory(self, version: int) -> bool:
+        """Проверяет, хранится ли состояние версии в памяти, а не вытеснено на диск."""
+        return not isinstance(self._history, TieredHistory) or self._history.in_memory(version)
+
+    def _compute_hash(self, state: any) -> int:
+        """Вычисляет структурный хеш состояния целиком.
+
+        :param state: Состояние персистентной структуры данных.
+        :return: Хеш состояния.
+        """
+        return hash_value(state)
+
+    def _state_size(self, state: any) -> int:
+        """Оценивает объем состояния в памяти для ограничения объема горячих версий.
+
+        :param state: Состояние персистентной структуры данных.
+        :return: Оценка объема в байтах.
+        """
+        return estimate_size(state)
+
+    def _states_equal(self, first: any, second: any) -> bool:
+        """Сравнивает два состояния персистентной структуры данных.
+
+        :param first: Первое состояние.
+        :param second: Второе состояние.
+        :return: True, если состояния равны, иначе False.
+        """
+        return first == second
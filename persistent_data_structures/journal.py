@@ -0,0 +1,342 @@
+import atexit
+import os
+import pickle
+import struct
+import tempfile
+import threading
+import zlib
+
+
+class Journal:
+    """Журнал операций для персистентных структур данных.
+
+    Каждая изменяющая операция структуры записывается в журнал компактной двоичной
+    записью после ее успешного выполнения, до возврата управления из операции.
+    Записи накапливаются в буфере и сбрасываются на диск группами (group commit),
+    а вызов fsync выполняется раз в несколько сбросов.
+
+    Какие записи сохранены на диске к моменту возврата из операции:
+    - при sync_commit=True - все: операция ждет fsync своей записи, а потоки, ожидающие
+      одновременно, разделяют один вызов fsync;
+    - при sync_commit=False - только записи сброшенных групп; неполная группа сбрасывается
+      на диск не позже чем через flush_interval секунд (с fsync, если fsync_every не 0),
+      при вызове sync() или close() и при нормальном завершении интерпретатора.
+    Восстановление загружает последний снимок и повторяет поверх него записи журнала.
+    Сжатие (compaction) сохраняет новый снимок и удаляет уже учтенные в нем сегменты.
+
+    Формат записи: длина полезной нагрузки, CRC32 и номер записи (LSN) в заголовке
+    ``<IIQ``, затем сериализованная через pickle пара ``(операция, аргументы)``.
+    """
+
+    SNAPSHOT_FILE = 'snapshot.bin'
+    SEGMENT_PREFIX = 'journal-'
+    SEGMENT_SUFFIX = '.log'
+
+    _RECORD_HEADER = struct.Struct('<IIQ')
+    _SNAPSHOT_HEADER = struct.Struct('<8sQ')
+    _SNAPSHOT_MAGIC = b'PDSSNAP1'
+
+    def __init__(self, directory: str, group_commit: int = 64, fsync_every: int = 1,
+                 sync_commit: bool = False, flush_interval: float | None = 0.05) -> None:
+        """Открывает журнал в указанной директории.
+
+        Новые записи всегда пишутся в новый сегмент, поэтому возможный оборванный хвост
+        предыдущего сегмента никогда не дописывается.
+        :param directory: Директория для снимка и сегментов журнала.
+        :param group_commit: Количество записей, накапливаемых в буфере до сброса на диск.
+        :param fsync_every: Через сколько сбросов буфера вызывать fsync (0 - не вызывать).
+        :param sync_commit: Ждать ли в append выполнения fsync для добавленной записи.
+        :param flush_interval: Интервал в секундах, через который фоновый поток сбрасывает
+            неполную группу записей на диск с fsync (None - не сбрасывать по времени).
+        :raises ValueError: Если параметры group commit, fsync или интервал сброса заданы неверно.
+        """
+        if group_commit < 1:
+            raise ValueError('group_commit must be positive')
+        if fsync_every < 0:
+            raise ValueError('fsync_every must be non-negative')
+        if flush_interval is not None and flush_interval <= 0:
+            raise ValueError('flush_interval must be positive')
+        self.directory = directory
+        self.group_commit = group_commit
+        self.fsync_every = fsync_every
+        self.sync_commit = sync_commit
+        self.flush_interval = flush_interval
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Condition()
+        self._buffer = bytearray()
+        self._buffered = 0
+        self._flushes = 0
+        self._syncing = False
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_lsn = self._read_snapshot_header()
+        segments = self._segments()
+        self._lsn = max([self._snapshot_lsn] + [self._last_lsn(path) for path in segments])
+        self._segment = self._segment_number(segments[-1]) + 1 if segments else 1
+        self._file = open(self._segment_path(self._segment), 'ab')
+        self._written_lsn = self._durable_lsn = self._lsn
+        self._closed = threading.Event()
+        self._flusher = None
+        if flush_interval is not None:
+            self._flusher = threading.Thread(target=self._run_flusher, daemon=True)
+            self._flusher.start()
+        atexit.register(self.close)
+
+    @classmethod
+    def recover(cls, directory: str, **options) -> any:
+        """Восстанавливает структуру данных из снимка и журнала.
+
+        Загружает последний снимок, повторяет поверх него все записи журнала с номерами
+        больше номера снимка и подключает журнал к восстановленной структуре. В журнале
+        есть только успешно выполненные операции, поэтому ошибка при повторе операции
+        означает, что журнал не соответствует структуре, и передается вызывающему коду.
+        :param directory: Директория журнала.
+        :param options: Параметры, передаваемые в конструктор журнала.
+        :return: Восстановленная структура данных с подключенным журналом.
+        :raises FileNotFoundError: Если в директории нет снимка.
+        """
+        journal = cls(directory, **options)
+        structure = journal.load_snapshot()
+        for op, args in journal.replay():
+            getattr(structure, op)(*args)
+        structure._journal = journal
+        return structure
+
+    def append(self, op: str, args: tuple) -> int:
+        """Добавляет запись об операции в журнал.
+
+        При sync_commit=True возвращает управление только после fsync добавленной записи.
+        :param op: Имя метода структуры данных.
+        :param args: Аргументы метода.
+        :return: Номер (LSN) добавленной записи.
+        """
+        payload = pickle.dumps((op, args), protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._lsn += 1
+            lsn = self._lsn
+            self._buffer += self._RECORD_HEADER.pack(len(payload), zlib.crc32(payload), lsn)
+            self._buffer += payload
+            self._buffered += 1
+            if self._buffered >= self.group_commit:
+                self._flush()
+            if self.sync_commit:
+                self._wait_durable(lsn)
+        return lsn
+
+    def flush(self) -> None:
+        """Сбрасывает буфер записей на диск (fsync выполняется согласно fsync_every)."""
+        with self._lock:
+            self._flush()
+
+    def sync(self) -> None:
+        """Сбрасывает буфер записей на диск и принудительно вызывает fsync."""
+        with self._lock:
+            self._wait_durable(self._lsn)
+
+    def close(self) -> None:
+        """Сбрасывает буфер на диск с fsync и закрывает журнал."""
+        atexit.unregister(self.close)
+        self._closed.set()
+        if self._flusher is not None and self._flusher is not threading.current_thread():
+            self._flusher.join()
+        with self._lock:
+            if self._file.closed:
+                return
+            self._close_segment()
+
+    def checkpoint(self, structure: any) -> None:
+        """Синхронно сохраняет снимок структуры данных и удаляет учтенные в нем сегменты.
+
+        :param structure: Структура данных, к которой подключен журнал.
+        """
+        self.compact(structure)
+
+    def compact(self, structure: any, background: bool = False) -> threading.Thread | None:
+        """Сворачивает журнал в новый снимок структуры данных.
+
+        Состояние структуры сериализуется в вызывающем потоке, а запись снимка на диск и
+        удаление старых сегментов при background=True выполняются в отдельном потоке.
+        Одновременные сжатия записывают снимки по очереди, и снимок не заменяется более
+        старым снимком.
+        :param structure: Структура данных, к которой подключен журнал.
+        :param background: Выполнять ли запись снимка в фоновом потоке.
+        :return: Фоновый поток, если background=True, иначе None.
+        """
+        data = pickle.dumps(structure, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._close_segment()
+            lsn = self._lsn
+            obsolete = self._segment
+            self._segment += 1
+            self._file = open(self._segment_path(self._segment), 'ab')
+        if not background:
+            self._write_snapshot(data, lsn, obsolete)
+            return None
+        thread = threading.Thread(target=self._write_snapshot, args=(data, lsn, obsolete))
+        thread.start()
+        return thread
+
+    def load_snapshot(self) -> any:
+        """Загружает структуру данных из последнего снимка.
+
+        :return: Структура данных в состоянии на момент снимка.
+        :raises FileNotFoundError: Если снимок не существует.
+        """
+        with open(os.path.join(self.directory, self.SNAPSHOT_FILE), 'rb') as file:
+            file.read(self._SNAPSHOT_HEADER.size)
+            return pickle.load(file)
+
+    def replay(self):
+        """Возвращает записи журнала, не учтенные в последнем снимке.
+
+        Чтение сегмента прекращается на первой оборванной или поврежденной записи.
+        :return: Генератор пар (операция, аргументы) в порядке записи.
+        """
+        for path in self._segments():
+            for lsn, payload in self._read_records(path):
+                if lsn > self._snapshot_lsn:
+                    yield pickle.loads(payload)
+
+    def _flush(self) -> None:
+        """Записывает буфер в текущий сегмент. Вызывается под блокировкой."""
+        if not self._buffered:
+            return
+        self._write_buffer()
+        self._flushes += 1
+        if self.fsync_every and self._flushes % self.fsync_every == 0:
+            os.fsync(self._file.fileno())
+            self._durable_lsn = self._written_lsn
+            self._lock.notify_all()
+
+    def _write_buffer(self) -> None:
+        """Записывает буфер в файл сегмента без fsync. Вызывается под блокировкой."""
+        self._file.write(self._buffer)
+        self._file.flush()
+        self._buffer.clear()
+        self._buffered = 0
+        self._written_lsn = self._lsn
+
+    def _wait_durable(self, lsn: int) -> None:
+        """Ждет, пока запись с указанным номером не будет сохранена на диске с fsync.
+
+        Вызывается под блокировкой. Первый ожидающий поток записывает буфер и вызывает fsync
+        без блокировки, остальные ждут его завершения, поэтому записи, добавленные за время
+        fsync, сохраняются следующим общим вызовом.
+        """
+        while self._durable_lsn < lsn:
+            if self._syncing:
+                self._lock.wait()
+                continue
+            if self._buffered:
+                self._write_buffer()
+            target = self._written_lsn
+            self._syncing = True
+            self._lock.release()
+            try:
+                os.fsync(self._file.fileno())
+            finally:
+                self._lock.acquire()
+                self._syncing = False
+            self._durable_lsn = max(self._durable_lsn, target)
+            self._lock.notify_all()
+
+    def _close_segment(self) -> None:
+        """Сохраняет на диске все записи и закрывает текущий сегмент. Вызывается под блокировкой."""
+        self._wait_durable(self._lsn)
+        while self._syncing:
+            self._lock.wait()
+        self._file.close()
+
+    def _run_flusher(self) -> None:
+        """Периодически сохраняет на диске записи неполной группы."""
+        while not self._closed.wait(self.flush_interval):
+            with self._lock:
+                if self._file.closed:
+                    return
+                if not self.fsync_every:
+                    self._flush()
+                elif self._durable_lsn < self._lsn:
+                    self._wait_durable(self._lsn)
+
+    def _write_snapshot(self, data: bytes, lsn: int, obsolete: int) -> None:
+        """Атомарно записывает снимок и удаляет сегменты с номерами не больше obsolete.
+
+        Снимок не записывается, если уже сохранен снимок с тем же или большим номером записи:
+        его сегменты могли быть удалены, и более старый снимок потерял бы записи.
+        """
+        path = os.path.join(self.directory, self.SNAPSHOT_FILE)
+        with self._snapshot_lock:
+            if lsn <= self._snapshot_lsn and os.path.exists(path):
+                return
+            fd, tmp_path = tempfile.mkstemp(prefix=self.SNAPSHOT_FILE + '.', suffix='.tmp',
+                                            dir=self.directory)
+            with os.fdopen(fd, 'wb') as file:
+                file.write(self._SNAPSHOT_HEADER.pack(self._SNAPSHOT_MAGIC, lsn))
+                file.write(data)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, path)
+            self._fsync_directory()
+            self._snapshot_lsn = lsn
+            for segment in self._segments():
+                if self._segment_number(segment) <= obsolete:
+                    os.remove(segment)
+
+    def _read_snapshot_header(self) -> int:
+        """Возвращает номер последней записи, учтенной в снимке (0, если снимка нет)."""
+        try:
+            with open(os.path.join(self.directory, self.SNAPSHOT_FILE), 'rb') as file:
+                header = file.read(self._SNAPSHOT_HEADER.size)
+        except FileNotFoundError:
+            return 0
+        magic, lsn = self._SNAPSHOT_HEADER.unpack(header)
+        if magic != self._SNAPSHOT_MAGIC:
+            raise ValueError(f'File "{self.SNAPSHOT_FILE}" is not a snapshot')
+        return lsn
+
+    def _read_records(self, path: str):
+        """Читает целые записи сегмента в виде пар (LSN, полезная нагрузка)."""
+        with open(path, 'rb') as file:
+            data = file.read()
+        offset = 0
+        header_size = self._RECORD_HEADER.size
+        while offset + header_size <= len(data):
+            length, crc, lsn = self._RECORD_HEADER.unpack_from(data, offset)
+            payload = data[offset + header_size:offset + header_size + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                return
+            yield lsn, payload
+            offset += header_size + length
+
+    def _last_lsn(self, path: str) -> int:
+        """Возвращает номер последней целой записи сегмента."""
+        lsn = 0
+        for lsn, _ in self._read_records(path):
+            pass
+        return lsn
+
+    def _segments(self) -> list:
+        """Возвращает пути сегментов журнала, отсортированные по номеру."""
+        names = [name for name in os.listdir(self.directory)
+                 if name.startswith(self.SEGMENT_PREFIX) and name.endswith(self.SEGMENT_SUFFIX)]
+        paths = [os.path.join(self.directory, name) for name in names]
+        return sorted(paths, key=self._segment_number)
+
+    def _segment_path(self, number: int) -> str:
+        """Возвращает путь сегмента журнала с указанным номером."""
+        return os.path.join(self.directory,
+                            f'{self.SEGMENT_PREFIX}{number:06d}{self.SEGMENT_SUFFIX}')
+
+    def _segment_number(self, path: str) -> int:
+        """Возвращает номер сегмента по его пути."""
+        name = os.path.basename(path)
+        return int(name[len(self.SEGMENT_PREFIX):-len(self.SEGMENT_SUFFIX)])
+
+    def _fsync_directory(self) -> None:
+        """Сбрасывает на диск изменения директории (переименование снимка)."""
+        if not hasattr(os, 'O_DIRECTORY'):
+            return
+        fd = os.open(self.directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
@@ -1,6 +1,8 @@
 import numpy as np
 
-from persistent_data_structures.base_persistent import BasePersistent
+from persistent_data_structures.base_persistent import (HASH_BASE, HASH_MODULUS, BasePersistent,
+                                                        hash_sequence, hash_value)
+from persistent_data_structures.segment_tree import PersistentSegmentTree
 
 
 class PersistentArray(BasePersistent):
@@ -8,20 +10,29 @@ class PersistentArray(BasePersistent):
     Класс PersistentArray реализует неизменяемый массив с
     возможностью хранения нескольких версий, где каждая
     версия является изменением предыдущей.
+
+    При указании aggregates для массива ведется персистентное дерево отрезков, узлы
+    которого разделяются между версиями. Оно позволяет получать агрегаты (сумму, минимум,
+    максимум, количество или пользовательский моноид) на отрезке любой версии за O(log n).
     """
 
-    def __init__(self, size: int = 1024, default_value: int = 0) -> None:
+    def __init__(self, size: int = 1024, default_value: int = 0, aggregates: list = None) -> None:
         """Инициализирует новый массив с несколькими версиями.
 
         Создается первая версия массива, которая состоит из элементов,
         равных default_value.
         :param size: Начальный размер массива (по умолчанию 1024).
         :param default_value: Значение по умолчанию для элементов массива (по умолчанию 0).
+        :param aggregates: Моноиды (segment_tree.Monoid) или имена встроенных моноидов
+            ('sum', 'min', 'max', 'count') для запросов на отрезках (по умолчанию не ведутся).
         """
         self.size = size
         self.default_value = default_value
         initial_state = np.full(size, default_value)
         super().__init__(initial_state)
+        self._aggregates = PersistentSegmentTree(aggregates) if aggregates else None
+        if self._aggregates is not None:
+            self._aggregate_roots = {0: self._aggregates.build(initial_state.tolist())}
 
     def __getitem__(self, index: int) -> any:
         """Получение значения из текущей версии массива по индексу.
@@ -54,8 +65,14 @@ class PersistentArray(BasePersistent):
         :param value (int): Значение нового элемента, который добавляется в массив.
         """
         self._create_new_state()
-        self._history[self._last_state] = np.append(self._history[self._last_state], value)
+        state = np.append(self._history[self._last_state], value)
+        self._history[self._last_state] = state
         self.size += 1
+        self._update_aggregates('insert', len(state) - 1, state[-1].item())
+        power = pow(HASH_BASE, len(state), HASH_MODULUS)
+        self._commit_state((self._hashes[self._last_state] + hash_value(state[-1]) * power)
+                           % HASH_MODULUS)
+        self._log('add', value)
 
     def pop(self, index: int) -> any:
         """Удаление элемента в новой версии массива и возвращение его значения.
@@ -70,6 +87,9 @@ class PersistentArray(BasePersistent):
         self._create_new_state()
         self._history[self._last_state] = np.delete(self._history[self._last_state], index)
         self.size -= 1
+        self._update_aggregates('delete', index)
+        self._commit_state(self._compute_hash(self._history[self._last_state]))
+        self._log('pop', index)
         return removed_element
 
     def __setitem__(self, index: int, value: any) -> None:
@@ -83,8 +103,16 @@ class PersistentArray(BasePersistent):
         """
         if index < 0 or index >= self.size:
             raise ValueError("Invalid index")
+        self._check_value(value)
         self._create_new_state()
-        self._history[self._last_state][index] = value
+        state = self._history[self._last_state]
+        old_hash = hash_value(state[index])
+        state[index] = value
+        self._update_aggregates('set', index, state[index].item())
+        power = pow(HASH_BASE, index + 1, HASH_MODULUS)
+        self._commit_state((self._hashes[self._last_state]
+                            + (hash_value(state[index]) - old_hash) * power) % HASH_MODULUS)
+        self._log('__setitem__', index, value)
 
     def insert(self, index: int, value: any) -> None:
         """Вставка нового элемента в массив в указанную позицию в новой версии.
@@ -97,9 +125,13 @@ class PersistentArray(BasePersistent):
         """
         if index < 0 or index > self.size:
             raise ValueError("Invalid index")
+        self._check_value(value)
         self._create_new_state()
         self._history[self._last_state] = np.insert(self._history[self._last_state], index, value)
         self.size += 1
+        self._update_aggregates('insert', index, self._history[self._last_state][index].item())
+        self._commit_state(self._compute_hash(self._history[self._last_state]))
+        self._log('insert', index, value)
 
     def remove(self, index: int) -> None:
         """Удаление элемента в новой версии массива по индексу.
@@ -112,6 +144,34 @@ class PersistentArray(BasePersistent):
             raise ValueError("Invalid index")
         self.pop(index)
 
+    def range_query(self, version: int, lo: int, hi: int, op: any = 'sum') -> any:
+        """Получение агрегата элементов указанной версии массива на отрезке [lo, hi).
+
+        :param version: Номер версии массива.
+        :param lo: Индекс первого элемента отрезка.
+        :param hi: Индекс, следующий за последним элементом отрезка.
+        :param op: Моноид или его имя из указанных при создании массива (по умолчанию 'sum').
+        :return: Значение агрегата (нейтральный элемент моноида для пустого отрезка).
+        :raises ValueError: Если агрегаты не ведутся, версия или отрезок не существуют.
+        """
+        if self._aggregates is None:
+            raise ValueError("Aggregates are not enabled")
+        if version < 0 or version >= len(self._history):
+            raise ValueError(f'Version "{version}" does not exist')
+        root = self._aggregate_roots[version]
+        if lo < 0 or hi < lo or hi > self._aggregates.size(root):
+            raise ValueError("Invalid index")
+        return self._aggregates.query(root, lo, hi, op)
+
+    def update_version(self, version: int) -> None:
+        """Обновляет текущую версию массива до указанной.
+
+        :param version: Номер версии.
+        :raises ValueError: Если указанная версия не существует.
+        """
+        super().update_version(version)
+        self.size = len(self._history[version])
+
     def get_size(self) -> int:
         """Получение текущего размера массива.
 
@@ -125,3 +185,39 @@ class PersistentArray(BasePersistent):
         :return: True, если массив пуст, иначе False.
         """
         return self.size == 0
+
+    def _check_value(self, value: any) -> None:
+        """Проверяет, что значение - скаляр, приводимый к типу элементов массива.
+
+        :param value: Значение элемента.
+        :raises ValueError: Если значение не скаляр или не приводится к типу элементов массива.
+        :raises TypeError: Если тип значения не приводится к типу элементов массива.
+        """
+        if np.array(value, dtype=self._history[self._current_state].dtype).ndim:
+            raise ValueError("Value must be a scalar")
+
+    def _compute_hash(self, state: np.ndarray) -> int:
+        """Вычисляет полиномиальный хеш элементов массива."""
+        return hash_sequence(state.tolist())
+
+    def _states_equal(self, first: np.ndarray, second: np.ndarray) -> bool:
+        """Сравнивает два состояния массива поэлементно."""
+        return np.array_equal(first, second)
+
+    def _create_new_state(self) -> None:
+        """Создает новую версию, разделяющую дерево агрегатов с родительской версией."""
+        parent = self._current_state
+        super()._create_new_state()
+        if self._aggregates is not None:
+            self._aggregate_roots[self._last_state] = self._aggregate_roots[parent]
+
+    def _update_aggregates(self, operation: str, *args) -> None:
+        """Применяет изменение к дереву агрегатов последней версии, если оно ведется.
+
+        :param operation: Операция дерева ('set', 'insert' или 'delete').
+        :param args: Аргументы операции без корня дерева.
+        """
+        if self._aggregates is None:
+            return
+        root = self._aggregate_roots[self._last_state]
+        self._aggregate_roots[self._last_state] = getattr(self._aggregates, operation)(root, *args)
@@ -1,4 +1,7 @@
-from persistent_data_structures.base_persistent import BasePersistent
+import sys
+
+from persistent_data_structures.base_persistent import (HASH_BASE, HASH_MODULUS, BasePersistent,
+                                                        hash_sequence, hash_value)
 
 
 class Node:
@@ -47,6 +50,7 @@ class PersistentLinkedList(BasePersistent):
                     tail = node
             self.size = len(initial_state)
         self._history[0] = (head, tail)
+        self._hashes[0] = self._compute_hash(self._history[0])
 
     def add(self, data: any) -> None:
         """
@@ -66,6 +70,10 @@ class PersistentLinkedList(BasePersistent):
             tail = new_node
         self.size += 1
         self._history[self._last_state] = (head, tail)
+        power = pow(HASH_BASE, self.size, HASH_MODULUS)
+        self._commit_state((self._hashes[self._last_state] + hash_value(data) * power)
+                           % HASH_MODULUS)
+        self._log('add', data)
 
     def add_first(self, data: any) -> None:
         """
@@ -84,6 +92,9 @@ class PersistentLinkedList(BasePersistent):
             tail = new_node
         self.size += 1
         self._history[self._last_state] = (head, tail)
+        self._commit_state((self._hashes[self._last_state] + hash_value(data)) * HASH_BASE
+                           % HASH_MODULUS)
+        self._log('add_first', data)
 
     def insert(self, index: int, data: any) -> None:
         """
@@ -94,25 +105,21 @@ class PersistentLinkedList(BasePersistent):
         :return: None
         :raises IndexError: Если индекс выходит за пределы списка.
         """
+        if self._node_at(self._history[self._current_state][0], index) is None:
+            raise IndexError("Index out of range")
         self._create_new_state()
         head, tail = self._history[self._last_state]
-        current = head
-        count = 0
-        while current:
-            if count == index:
-                new_node = Node(data, prev=current.prev, next_node=current)
-                if current.prev:
-                    current.prev.next_node = new_node
-                current.prev = new_node
-                if current == head:
-                    head = new_node
-                self.size += 1
-                break
-            count += 1
-            current = current.next_node
-        else:
-            raise IndexError("Index out of range")
+        current = self._node_at(head, index)
+        new_node = Node(data, prev=current.prev, next_node=current)
+        if current.prev:
+            current.prev.next_node = new_node
+        current.prev = new_node
+        if current == head:
+            head = new_node
+        self.size += 1
         self._history[self._last_state] = (head, tail)
+        self._commit_state(self._compute_hash((head, tail)))
+        self._log('insert', index, data)
 
     def pop(self, index: int) -> any:
         """
@@ -123,26 +130,17 @@ class PersistentLinkedList(BasePersistent):
         :raises IndexError: Если индекс выходит за пределы списка.
         """
         head, tail = self._history[self._current_state]
-        current = head
-        count = 0
-        while current:
-            if count == index:
-                value = current.value
-                if current.prev:
-                    current.prev.next_node = current.next_node
-                if current.next_node:
-                    current.next_node.prev = current.prev
-                if current == head:
-                    head = current.next_node
-                if current == tail:
-                    tail = current.prev
-                self._create_new_state()
-                self.size -= 1
-                self._history[self._last_state] = (head, tail)
-                return value
-            count += 1
-            current = current.next_node
-        raise IndexError("Index out of range")
+        if self._node_at(head, index) is None:
+            raise IndexError("Index out of range")
+        self._create_new_state()
+        head, tail = self._history[self._last_state]
+        current = self._node_at(head, index)
+        value = current.value
+        self._unlink(current)
+        self.size -= 1
+        self._commit_removal(head, tail, current)
+        self._log('pop', index)
+        return value
 
     def remove(self, value: any) -> None:
         """
@@ -154,20 +152,18 @@ class PersistentLinkedList(BasePersistent):
         """
         head, tail = self._history[self._current_state]
         current = head
+        index = 0
         while current:
             if current.value == value:
-                if current.prev:
-                    current.prev.next_node = current.next_node
-                if current.next_node:
-                    current.next_node.prev = current.prev
-                if current == head:
-                    head = current.next_node
-                if current == tail:
-                    tail = current.prev
                 self._create_new_state()
+                head, tail = self._history[self._last_state]
+                current = self._node_at(head, index)
+                self._unlink(current)
                 self.size -= 1
-                self._history[self._last_state] = (head, tail)
+                self._commit_removal(head, tail, current)
+                self._log('remove', value)
                 return
+            index += 1
             current = current.next_node
         raise ValueError(f"Value {value} not found in the list")
 
@@ -206,6 +202,8 @@ class PersistentLinkedList(BasePersistent):
         self._create_new_state()
         self.size = 0
         self._history[self._last_state] = (None, None)
+        self._commit_state(0)
+        self._log('clear')
 
     def __getitem__(self, index: int) -> any:
         """
@@ -233,19 +231,28 @@ class PersistentLinkedList(BasePersistent):
         :param value: Новое значение для обновляемого элемента.
         :raises IndexError: Если индекс выходит за пределы списка.
         """
+        if self._node_at(self._history[self._current_state][0], index) is None:
+            raise IndexError("Index out of range")
         self._create_new_state()
         head, tail = self._history[self._last_state]
-        current = head
-        count = 0
-        while current:
-            if count == index:
-                current.value = value
-                break
-            count += 1
-            current = current.next_node
-        else:
-            raise IndexError("Index out of range")
+        current = self._node_at(head, index)
+        old_value = current.value
+        current.value = value
         self._history[self._last_state] = (head, tail)
+        power = pow(HASH_BASE, index + 1, HASH_MODULUS)
+        self._commit_state((self._hashes[self._last_state]
+                            + (hash_value(value) - hash_value(old_value)) * power) % HASH_MODULUS)
+        self._log('__setitem__', index, value)
+
+    def update_version(self, version: int) -> None:
+        """
+        Обновляет текущую версию списка до указанной.
+
+        :param version: Номер версии.
+        :raises ValueError: Если указанная версия не существует.
+        """
+        super().update_version(version)
+        self.size = sum(1 for _ in self._iter_values(self._history[version]))
 
     def get_size(self) -> int:
         """
@@ -263,3 +270,94 @@ class PersistentLinkedList(BasePersistent):
         """
         head, tail = self._history[self._current_state]
         return head is None
+
+    def _node_at(self, head: Node, index: int) -> Node | None:
+        """
+        Возвращает узел по индексу, начиная с указанной головы списка.
+
+        :param head: Голова списка.
+        :param index: Индекс узла.
+        :return: Узел или None, если индекс выходит за пределы списка.
+        """
+        current = head
+        count = 0
+        while current:
+            if count == index:
+                return current
+            count += 1
+            current = current.next_node
+        return None
+
+    def _unlink(self, node: Node) -> None:
+        """
+        Исключает узел из списка, связывая его соседей между собой.
+
+        :param node: Исключаемый узел.
+        """
+        if node.prev:
+            node.prev.next_node = node.next_node
+        if node.next_node:
+            node.next_node.prev = node.prev
+
+    def _commit_removal(self, head: Node, tail: Node, node: Node) -> None:
+        """
+        Сохраняет состояние последней версии после исключения узла.
+
+        :param head: Голова списка до исключения узла.
+        :param tail: Хвост списка до исключения узла.
+        :param node: Исключенный узел.
+        """
+        if node is head:
+            head = node.next_node
+        if node is tail:
+            tail = node.prev
+        self._history[self._last_state] = (head, tail)
+        self._commit_state(self._compute_hash((head, tail)))
+
+    def _iter_values(self, state: tuple):
+        """
+        Перебирает значения элементов состояния списка от головы к хвосту.
+
+        :param state: Состояние списка (голова, хвост).
+        :return: Генератор значений элементов.
+        """
+        current = state[0]
+        while current:
+            yield current.value
+            current = current.next_node
+
+    def _compute_hash(self, state: tuple) -> int:
+        """
+        Вычисляет полиномиальный хеш значений элементов списка.
+
+        :param state: Состояние списка (голова, хвост).
+        :return: Хеш состояния.
+        """
+        if state is None:
+            return 0
+        return hash_sequence(self._iter_values(state))
+
+    def _state_size(self, state: tuple) -> int:
+        """
+        Оценивает объем состояния списка: узлы, их атрибуты и значения элементов.
+
+        :param state: Состояние списка (голова, хвост).
+        :return: Оценка объема в байтах.
+        """
+        size = sys.getsizeof(state)
+        current = state[0] if state else None
+        while current:
+            size += (sys.getsizeof(current) + sys.getsizeof(current.__dict__)
+                     + sys.getsizeof(current.value))
+            current = current.next_node
+        return size
+
+    def _states_equal(self, first: tuple, second: tuple) -> bool:
+        """
+        Сравнивает значения элементов двух состояний списка.
+
+        :param first: Первое состояние списка.
+        :param second: Второе состояние списка.
+        :return: True, если состояния равны, иначе False.
+        """
+        return list(self._iter_values(first)) == list(self._iter_values(second))
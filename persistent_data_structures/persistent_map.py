@@ -1,26 +1,158 @@
-from persistent_data_structures.base_persistent import BasePersistent
+import sys
+from bisect import bisect_right
+from collections.abc import MutableMapping
+from copy import deepcopy
+
+from persistent_data_structures.base_persistent import HASH_MODULUS, BasePersistent, hash_pair
+
+
+class _Deleted:
+    """Маркер удаления ключа в истории изменений ключа."""
+
+    def __repr__(self) -> str:
+        return 'DELETED'
+
+    def __reduce__(self) -> str:
+        return 'DELETED'
+
+
+DELETED = _Deleted()
+
+_ATOMIC_TYPES = frozenset((type(None), bool, int, float, complex, str, bytes))
+
+
+class FlatMap(MutableMapping):
+    """Компактное представление небольшого ассоциативного массива.
+
+    Ключи и значения хранятся в одном кортеже, чередуясь: (k0, v0, k1, v1, ...). Поиск ключа
+    выполняется линейным просмотром ключей, а изменение создает новый кортеж. Для нескольких
+    ключей это занимает меньше памяти, чем словарь, а копия массива с неизменяемыми
+    значениями разделяет кортеж с исходным массивом.
+    """
+    __slots__ = ('_items',)
+
+    def __init__(self, items: any = ()) -> None:
+        """Создает компактный ассоциативный массив.
+
+        :param items: Словарь или последовательность пар ключ-значение.
+        """
+        self._items = tuple(item for pair in dict(items).items() for item in pair)
+
+    def __getitem__(self, key: any) -> any:
+        return self._items[self._find(key) + 1]
+
+    def __setitem__(self, key: any, value: any) -> None:
+        hash(key)
+        try:
+            index = self._find(key)
+        except KeyError:
+            self._items += (key, value)
+        else:
+            self._items = self._items[:index + 1] + (value,) + self._items[index + 2:]
+
+    def __delitem__(self, key: any) -> None:
+        index = self._find(key)
+        self._items = self._items[:index] + self._items[index + 2:]
+
+    def __contains__(self, key: any) -> bool:
+        return key in self._items[::2]
+
+    def __iter__(self):
+        return iter(self._items[::2])
+
+    def __len__(self) -> int:
+        return len(self._items) // 2
+
+    def __repr__(self) -> str:
+        return f'FlatMap({dict(self)!r})'
+
+    def __deepcopy__(self, memo: dict) -> 'FlatMap':
+        """Копирует массив; кортеж с ключами и неизменяемыми значениями не копируется."""
+        result = FlatMap.__new__(FlatMap)
+        if all(type(value) in _ATOMIC_TYPES for value in self._items[1::2]):
+            result._items = self._items
+        else:
+            result._items = tuple(deepcopy(item, memo) if i % 2 else item
+                                  for i, item in enumerate(self._items))
+        return result
+
+    def _find(self, key: any) -> int:
+        """Возвращает позицию ключа в кортеже элементов.
+
+        :raises KeyError: Если ключ не существует.
+        """
+        try:
+            return 2 * self._items[::2].index(key)
+        except ValueError:
+            raise KeyError(key) from None
 
 
 class PersistentMap(BasePersistent):
     """Персистентный ассоциативный массив.
 
     Представляет собой словарь, который сохраняет историю изменений.
+    Дерево версий разбито на ветви: новая версия продолжает ветвь родителя, если родитель -
+    последняя версия своей ветви, иначе начинает новую ветвь, которая запоминает версию
+    ответвления. Для каждого ключа ведется индекс изменений: для каждой ветви отсортированные
+    по номеру версии списки версий и значений. Поэтому вопросы "каким был ключ в версии v"
+    и "когда ключ менялся последний раз" решаются за O(d * log h), где d - количество
+    ответвлений на пути от версии v к начальной версии; изменения в соседних ветвях
+    не просматриваются. Для линейной истории d = 0.
+
+    Состояние версии хранится в одном из представлений: словарь ('dict'), компактный
+    список пар FlatMap ('flat') или, в адаптивном режиме ('adaptive'), FlatMap для версий
+    не больше promote_threshold ключей и словарь для более крупных версий. Словарь
+    снова сворачивается в FlatMap, когда версия уменьшается до demote_threshold ключей.
     """
-    def __init__(self, initial_state: dict = {}) -> None:
+    STORAGES = ('dict', 'flat', 'adaptive')
+
+    def __init__(self, initial_state: dict = {}, storage: str = 'dict',
+                 promote_threshold: int = 16, demote_threshold: int = 8) -> None:
         """Инициализирует персистентный ассоциативный массив.
 
         :param initial_state: Начальное состояние персистентной структуры данных.
+        :param storage: Представление состояний версий: 'dict', 'flat' или 'adaptive'.
+        :param promote_threshold: Количество ключей, при превышении которого версия
+            в адаптивном режиме хранится в словаре.
+        :param demote_threshold: Количество ключей, при котором версия в адаптивном
+            режиме снова хранится в FlatMap.
+        :raises ValueError: Если представление или пороги заданы неверно.
         """
+        if storage not in self.STORAGES:
+            raise ValueError(f'Storage "{storage}" does not exist')
+        if demote_threshold > promote_threshold:
+            raise ValueError('demote_threshold must not exceed promote_threshold')
+        self.storage = storage
+        self.promote_threshold = promote_threshold
+        self.demote_threshold = demote_threshold
         super().__init__(initial_state)
+        self._history[0] = self._adapt(initial_state)
+        self._branches = {0: 0}
+        self._branch_tips = [0]
+        self._branch_forks = [None]
+        self._key_versions = {}
+        self._key_values = {}
+        for key, value in initial_state.items():
+            self._record_change(key, value)
 
     def __setitem__(self, key: any, value: any) -> None:
         """Обновляет или создает элемент по указанному ключу в новой версии.
 
         :param key: Ключ
         :param value: Значение
+        :raises TypeError: Если ключ нехешируемый
         """
+        hash(key)
         self._create_new_state()
-        self._history[self._last_state][key] = value
+        state = self._history[self._last_state]
+        state_hash = self._hashes[self._last_state]
+        if key in state:
+            state_hash -= hash_pair(key, state[key])
+        state[key] = value
+        self._history[self._last_state] = self._adapt(state)
+        self._record_change(key, value)
+        self._commit_state((state_hash + hash_pair(key, value)) % HASH_MODULUS)
+        self._log('__setitem__', key, value)
 
     def __getitem__(self, key: any) -> any:
         """Возвращает элемент текущей версии по указанному ключу.
@@ -34,24 +166,94 @@ class PersistentMap(BasePersistent):
 
         :param version: Номер версии
         :param key: Ключ
-        :return: Значение сответствующее указанному ключу или None, если ключ не существует.
+        :return: Значение сответствующее указанному ключу в указанной версии.
         :raises ValueError: Если версия не существует
         :raises KeyError: Если ключ не существует
         """
-        if version > self._current_state or version < 0:
+        if version > self._last_state or version < 0:
+            raise ValueError(f'Version "{version}" does not exist')
+        value = self._value_at(version, key)
+        if value is DELETED:
+            raise KeyError(f'Key "{key}" does not exist')
+        return value
+
+    def get_many(self, versions: list, key: any, default: any = None) -> list:
+        """Возвращает значения ключа сразу для нескольких версий.
+
+        :param versions: Номера версий
+        :param key: Ключ
+        :param default: Значение для версий, в которых ключ не существует
+        :return: Список значений ключа в порядке переданных версий.
+        :raises ValueError: Если одна из версий не существует
+        """
+        result = []
+        for version in versions:
+            if version > self._last_state or version < 0:
+                raise ValueError(f'Version "{version}" does not exist')
+            value = self._value_at(version, key)
+            result.append(default if value is DELETED else value)
+        return result
+
+    def key_history(self, key: any, version: int = None) -> list:
+        """Возвращает историю изменений ключа вплоть до указанной версии.
+
+        Учитываются только изменения в версиях, от которых произошла указанная версия.
+        :param key: Ключ
+        :param version: Номер версии (по умолчанию текущая версия)
+        :return: Список пар (версия, значение) в порядке изменений; удаление ключа
+            обозначается значением DELETED.
+        :raises ValueError: Если версия не существует
+        """
+        if version is None:
+            version = self._current_state
+        if version > self._last_state or version < 0:
+            raise ValueError(f'Version "{version}" does not exist')
+        result = []
+        while version is not None:
+            branch = self._branches[version]
+            versions = self._key_versions.get(key, {}).get(branch, [])
+            values = self._key_values[key][branch] if versions else []
+            end = bisect_right(versions, version)
+            result[:0] = zip(versions[:end], values[:end])
+            version = self._branch_forks[branch]
+        return result
+
+    def last_modified(self, key: any, version: int = None) -> int:
+        """Возвращает номер версии, в которой ключ последний раз изменялся.
+
+        :param key: Ключ
+        :param version: Номер версии, относительно которой ведется поиск
+            (по умолчанию текущая версия)
+        :return: Номер версии последнего изменения ключа.
+        :raises ValueError: Если версия не существует
+        :raises KeyError: Если ключ не изменялся ни в одной из предшествующих версий
+        """
+        if version is None:
+            version = self._current_state
+        if version > self._last_state or version < 0:
             raise ValueError(f'Version "{version}" does not exist')
-        if key not in self._history[version]:
+        change = self._find_change(version, key)
+        if change is None:
             raise KeyError(f'Key "{key}" does not exist')
-        return self._history[version]
+        return self._key_versions[key][change[0]][change[1]]
 
     def pop(self, key: any) -> any:
         """Удаляет элемент по указанному ключу и возвращает его.
 
         :param key: Ключ
         :return: Удаленный элемент
+        :raises KeyError: Если ключ не существует
         """
+        if key not in self._history[self._current_state]:
+            raise KeyError(key)
         self._create_new_state()
-        return self._history[self._last_state].pop(key)
+        state = self._history[self._last_state]
+        value = state.pop(key)
+        self._history[self._last_state] = self._adapt(state)
+        self._record_change(key, DELETED)
+        self._commit_state((self._hashes[self._last_state] - hash_pair(key, value)) % HASH_MODULUS)
+        self._log('pop', key)
+        return value
 
     def remove(self, key: any) -> None:
         """Удаляет элемент по указанному ключу в новой версии.
@@ -63,4 +265,77 @@ class PersistentMap(BasePersistent):
     def clear(self) -> None:
         """Очищает ассоциативный массив в новой версии."""
         self._create_new_state()
-        self._history[self._current_state] = {}
+        for key in self._history[self._current_state]:
+            self._record_change(key, DELETED)
+        self._history[self._current_state] = self._adapt({})
+        self._commit_state(0)
+        self._log('clear')
+
+    def _adapt(self, state: MutableMapping) -> MutableMapping:
+        """Приводит состояние версии к представлению, выбранному для ее размера.
+
+        :param state: Состояние версии.
+        :return: Состояние в выбранном представлении (исходный объект, если менять его не нужно).
+        """
+        if self.storage == 'dict':
+            use_flat = False
+        elif self.storage == 'flat':
+            use_flat = True
+        elif isinstance(state, FlatMap):
+            use_flat = len(state) <= self.promote_threshold
+        else:
+            use_flat = len(state) <= self.demote_threshold
+        if use_flat and not isinstance(state, FlatMap):
+            return FlatMap(state)
+        if not use_flat and isinstance(state, FlatMap):
+            return dict(state)
+        return state
+
+    def _compute_hash(self, state: dict) -> int:
+        """Вычисляет хеш состояния как сумму хешей пар ключ-значение."""
+        return sum(hash_pair(key, value) for key, value in state.items()) % HASH_MODULUS
+
+    def _state_size(self, state: MutableMapping) -> int:
+        """Оценивает объем версии: словарь или кортеж FlatMap вместе с ключами и значениями."""
+        size = sys.getsizeof(state)
+        if isinstance(state, FlatMap):
+            size += sys.getsizeof(state._items)
+        return size + sum(sys.getsizeof(key) + sys.getsizeof(value) for key, value in state.items())
+
+    def _create_new_state(self) -> None:
+        """Создает новую версию и запоминает ее ветвь в дереве версий."""
+        parent = self._current_state
+        super()._create_new_state()
+        branch = self._branches[parent]
+        if self._branch_tips[branch] != parent:
+            branch = len(self._branch_tips)
+            self._branch_tips.append(parent)
+            self._branch_forks.append(parent)
+        self._branches[self._last_state] = branch
+        self._branch_tips[branch] = self._last_state
+
+    def _record_change(self, key: any, value: any) -> None:
+        """Добавляет изменение ключа в последней версии в индекс изменений ее ветви."""
+        branch = self._branches[self._last_state]
+        self._key_versions.setdefault(key, {}).setdefault(branch, []).append(self._last_state)
+        self._key_values.setdefault(key, {}).setdefault(branch, []).append(value)
+
+    def _value_at(self, version: int, key: any) -> any:
+        """Возвращает значение ключа в указанной версии или DELETED."""
+        change = self._find_change(version, key)
+        return DELETED if change is None else self._key_values[key][change[0]][change[1]]
+
+    def _find_change(self, version: int, key: any) -> tuple | None:
+        """Возвращает ветвь и позицию в ней последнего изменения ключа среди предков версии."""
+        branches = self._key_versions.get(key)
+        if branches is None:
+            return None
+        while version is not None:
+            branch = self._branches[version]
+            versions = branches.get(branch)
+            if versions is not None:
+                index = bisect_right(versions, version) - 1
+                if index >= 0:
+                    return branch, index
+            version = self._branch_forks[branch]
+        return None
@@ -0,0 +1,227 @@
+import operator
+import pickle
+import random
+
+
+def _same(value: any) -> any:
+    """Возвращает значение без изменений."""
+    return value
+
+
+def _one(value: any) -> int:
+    """Возвращает 1 для любого значения."""
+    return 1
+
+
+class Monoid:
+    """Моноид для агрегирования значений на отрезке.
+
+    Задается ассоциативной операцией combine, нейтральным элементом identity и функцией lift,
+    переводящей элемент массива в значение моноида. Моноид сохраняется вместе с массивом
+    в снимках журнала, поэтому его функции должны сериализоваться через pickle
+    (функции уровня модуля, а не lambda или вложенные функции).
+    """
+
+    def __init__(self, name: str, combine: callable, identity: any, lift: callable = _same) -> None:
+        """Создает моноид.
+
+        :param name: Имя моноида, по которому выполняются запросы.
+        :param combine: Ассоциативная операция над двумя значениями моноида.
+        :param identity: Нейтральный элемент операции.
+        :param lift: Функция, переводящая элемент массива в значение моноида.
+        :raises ValueError: Если функции или нейтральный элемент не сериализуются через pickle.
+        """
+        try:
+            pickle.dumps((combine, identity, lift))
+        except (pickle.PicklingError, AttributeError, TypeError) as error:
+            raise ValueError(f'Monoid "{name}" must be picklable: {error}') from None
+        self.name = name
+        self.combine = combine
+        self.identity = identity
+        self.lift = lift
+
+    def __repr__(self) -> str:
+        return f'Monoid({self.name!r})'
+
+
+SUM = Monoid('sum', operator.add, 0)
+MIN = Monoid('min', min, float('inf'))
+MAX = Monoid('max', max, float('-inf'))
+COUNT = Monoid('count', operator.add, 0, _one)
+
+MONOIDS = {monoid.name: monoid for monoid in (SUM, MIN, MAX, COUNT)}
+
+
+class _Node:
+    """Узел дерева: элемент, поддеревья, размер поддерева и агрегаты поддерева."""
+    __slots__ = ('value', 'left', 'right', 'size', 'aggregates')
+
+    def __init__(self, value: any, left: '_Node', right: '_Node', size: int,
+                 aggregates: tuple) -> None:
+        self.value = value
+        self.left = left
+        self.right = right
+        self.size = size
+        self.aggregates = aggregates
+
+
+class PersistentSegmentTree:
+    """Персистентное дерево отрезков с неявными ключами для агрегатов на отрезках массива.
+
+    Дерево хранит элементы массива в порядке индексов (декартово дерево по неявному ключу,
+    в котором при слиянии корень выбирается случайно пропорционально размерам поддеревьев).
+    Каждый узел содержит агрегаты своего поддерева для всех моноидов. Узлы не изменяются
+    после создания: операции копируют только путь от корня до изменяемого места и возвращают
+    новый корень, а остальные узлы разделяются между версиями. Изменение, вставка, удаление
+    и запрос на отрезке выполняются за ожидаемое время O(log n).
+    """
+
+    def __init__(self, monoids: list) -> None:
+        """Создает дерево для указанных моноидов.
+
+        :param monoids: Моноиды или имена встроенных моноидов ('sum', 'min', 'max', 'count').
+        :raises ValueError: Если моноид с указанным именем не существует.
+        """
+        self.monoids = [self._resolve(monoid) for monoid in monoids]
+        self._positions = {monoid.name: i for i, monoid in enumerate(self.monoids)}
+        self._random = random.Random(0)
+
+    def build(self, values: list) -> _Node | None:
+        """Строит сбалансированное дерево из последовательности значений за O(n).
+
+        :param values: Значения элементов массива.
+        :return: Корень дерева.
+        """
+        def build_range(lo: int, hi: int) -> _Node | None:
+            if lo >= hi:
+                return None
+            mid = (lo + hi) // 2
+            return self._make(values[mid], build_range(lo, mid), build_range(mid + 1, hi))
+        return build_range(0, len(values))
+
+    def set(self, root: _Node, index: int, value: any) -> _Node:
+        """Возвращает корень дерева, в котором элемент с указанным индексом заменен.
+
+        :param root: Корень исходного дерева.
+        :param index: Индекс элемента.
+        :param value: Новое значение элемента.
+        :return: Корень нового дерева.
+        """
+        left_size = self._size(root.left)
+        if index < left_size:
+            return self._make(root.value, self.set(root.left, index, value), root.right)
+        if index > left_size:
+            return self._make(root.value, root.left,
+                              self.set(root.right, index - left_size - 1, value))
+        return self._make(value, root.left, root.right)
+
+    def insert(self, root: _Node | None, index: int, value: any) -> _Node:
+        """Возвращает корень дерева со вставленным перед указанным индексом элементом.
+
+        :param root: Корень исходного дерева.
+        :param index: Позиция вставки.
+        :param value: Значение нового элемента.
+        :return: Корень нового дерева.
+        """
+        left, right = self._split(root, index)
+        return self._merge(self._merge(left, self._make(value, None, None)), right)
+
+    def delete(self, root: _Node, index: int) -> _Node | None:
+        """Возвращает корень дерева без элемента с указанным индексом.
+
+        :param root: Корень исходного дерева.
+        :param index: Индекс удаляемого элемента.
+        :return: Корень нового дерева.
+        """
+        left, right = self._split(root, index)
+        _, right = self._split(right, 1)
+        return self._merge(left, right)
+
+    def query(self, root: _Node | None, lo: int, hi: int, monoid: any) -> any:
+        """Возвращает агрегат элементов с индексами из полуинтервала [lo, hi).
+
+        :param root: Корень дерева.
+        :param lo: Начало полуинтервала.
+        :param hi: Конец полуинтервала.
+        :param monoid: Моноид или его имя.
+        :return: Значение агрегата (нейтральный элемент для пустого полуинтервала).
+        :raises ValueError: Если моноид не поддерживается деревом.
+        """
+        name = monoid if isinstance(monoid, str) else monoid.name
+        if name not in self._positions:
+            raise ValueError(f'Aggregate "{name}" does not exist')
+        position = self._positions[name]
+        return self._query(root, lo, hi, self.monoids[position], position)
+
+    def _query(self, node: _Node | None, lo: int, hi: int, monoid: Monoid, position: int) -> any:
+        """Вычисляет агрегат на полуинтервале [lo, hi) поддерева node."""
+        if node is None or lo >= hi:
+            return monoid.identity
+        if lo <= 0 and hi >= node.size:
+            return node.aggregates[position]
+        left_size = self._size(node.left)
+        result = monoid.identity
+        if lo < left_size:
+            result = self._query(node.left, lo, min(hi, left_size), monoid, position)
+        if lo <= left_size < hi:
+            result = monoid.combine(result, monoid.lift(node.value))
+        if hi > left_size + 1:
+            result = monoid.combine(result, self._query(node.right, max(lo - left_size - 1, 0),
+                                                        hi - left_size - 1, monoid, position))
+        return result
+
+    def _split(self, node: _Node | None, count: int) -> tuple:
+        """Разделяет дерево на первые count элементов и остальные."""
+        if node is None:
+            return None, None
+        left_size = self._size(node.left)
+        if count <= left_size:
+            left, right = self._split(node.left, count)
+            return left, self._make(node.value, right, node.right)
+        left, right = self._split(node.right, count - left_size - 1)
+        return self._make(node.value, node.left, left), right
+
+    def _merge(self, left: _Node | None, right: _Node | None) -> _Node | None:
+        """Сливает два дерева, все элементы первого из которых идут раньше элементов второго."""
+        if left is None:
+            return right
+        if right is None:
+            return left
+        if self._random.randrange(left.size + right.size) < left.size:
+            return self._make(left.value, left.left, self._merge(left.right, right))
+        return self._make(right.value, self._merge(left, right.left), right.right)
+
+    def _make(self, value: any, left: _Node | None, right: _Node | None) -> _Node:
+        """Создает узел и вычисляет агрегаты его поддерева."""
+        aggregates = []
+        for position, monoid in enumerate(self.monoids):
+            aggregate = monoid.lift(value)
+            if left is not None:
+                aggregate = monoid.combine(left.aggregates[position], aggregate)
+            if right is not None:
+                aggregate = monoid.combine(aggregate, right.aggregates[position])
+            aggregates.append(aggregate)
+        return _Node(value, left, right, self._size(left) + self._size(right) + 1,
+                     tuple(aggregates))
+
+    def size(self, root: _Node | None) -> int:
+        """Возвращает количество элементов дерева.
+
+        :param root: Корень дерева.
+        :return: Количество элементов.
+        """
+        return self._size(root)
+
+    @staticmethod
+    def _size(node: _Node | None) -> int:
+        """Возвращает размер поддерева."""
+        return 0 if node is None else node.size
+
+    @staticmethod
+    def _resolve(monoid: any) -> Monoid:
+        """Возвращает моноид по его имени или сам моноид."""
+        if not isinstance(monoid, str):
+            return monoid
+        if monoid not in MONOIDS:
+            raise ValueError(f'Aggregate "{monoid}" does not exist')
+        return MONOIDS[monoid]
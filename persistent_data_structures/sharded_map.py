@@ -0,0 +1,179 @@
+import threading
+
+from persistent_data_structures.base_persistent import hash_value
+from persistent_data_structures.persistent_map import PersistentMap
+
+
+def _stable_hash(key: any) -> int:
+    """Возвращает хеш ключа, одинаковый во всех процессах.
+
+    Используется хеш канонического представления ключа (hash_value), поэтому строки,
+    кортежи и другие ключи попадают в один и тот же шард в любом процессе.
+    """
+    return hash_value(key)
+
+
+class ShardedPersistentMap:
+    """Персистентный ассоциативный массив, разделенный на независимые сегменты (шарды).
+
+    Ключи распределяются по шардам по хешу. Каждый шард - отдельный PersistentMap со своей
+    блокировкой и своей последовательностью версий, поэтому записи в разные шарды из разных
+    потоков не конкурируют между собой. Глобальная версия - кортеж версий всех шардов.
+    """
+
+    def __init__(self, initial_state: dict = {}, shards: int = 8, **options) -> None:
+        """Инициализирует разделенный на шарды ассоциативный массив.
+
+        :param initial_state: Начальное состояние.
+        :param shards: Количество шардов.
+        :param options: Параметры, передаваемые в конструктор PersistentMap каждого шарда.
+        :raises ValueError: Если количество шардов не положительно.
+        """
+        if shards < 1:
+            raise ValueError('shards must be positive')
+        parts = [{} for _ in range(shards)]
+        for key, value in initial_state.items():
+            parts[_stable_hash(key) % shards][key] = value
+        self._shards = [PersistentMap(part, **options) for part in parts]
+        self._locks = [threading.Lock() for _ in range(shards)]
+
+    def __setitem__(self, key: any, value: any) -> None:
+        """Обновляет или создает элемент по указанному ключу в новой версии его шарда.
+
+        :param key: Ключ
+        :param value: Значение
+        """
+        index = self._shard_index(key)
+        with self._locks[index]:
+            self._shards[index][key] = value
+
+    def __getitem__(self, key: any) -> any:
+        """Возвращает элемент текущей версии по указанному ключу.
+
+        :param key: Ключ
+        :return: Значение, соответствующее указанному ключу.
+        :raises KeyError: Если ключ не существует
+        """
+        index = self._shard_index(key)
+        with self._locks[index]:
+            return self._shards[index][key]
+
+    def get(self, version: tuple, key: any) -> any:
+        """Возвращает элемент с указанной глобальной версией и ключом.
+
+        :param version: Глобальная версия (кортеж версий шардов)
+        :param key: Ключ
+        :return: Значение, соответствующее указанному ключу в указанной версии.
+        :raises ValueError: Если версия не существует
+        :raises KeyError: Если ключ не существует
+        """
+        self._check_version(version)
+        index = self._shard_index(key)
+        with self._locks[index]:
+            return self._shards[index].get(version[index], key)
+
+    def pop(self, key: any) -> any:
+        """Удаляет элемент по указанному ключу в новой версии его шарда и возвращает его.
+
+        :param key: Ключ
+        :return: Удаленный элемент
+        """
+        index = self._shard_index(key)
+        with self._locks[index]:
+            return self._shards[index].pop(key)
+
+    def remove(self, key: any) -> None:
+        """Удаляет элемент по указанному ключу в новой версии его шарда.
+
+        :param key: Ключ
+        """
+        self.pop(key)
+
+    def clear(self) -> None:
+        """Очищает все шарды, создавая в каждом новую версию."""
+        with self._all_locks():
+            for shard in self._shards:
+                shard.clear()
+
+    def snapshot(self) -> tuple:
+        """Возвращает согласованную глобальную версию.
+
+        Версии шардов считываются при одновременно захваченных блокировках всех шардов.
+        :return: Кортеж текущих версий шардов.
+        """
+        with self._all_locks():
+            return tuple(shard._current_state for shard in self._shards)
+
+    def get_version(self, version: tuple) -> dict:
+        """Возвращает состояние на указанной глобальной версии.
+
+        :param version: Глобальная версия (кортеж версий шардов)
+        :return: Словарь со всеми ключами и значениями указанной версии.
+        :raises ValueError: Если версия не существует
+        """
+        self._check_version(version)
+        state = {}
+        with self._all_locks():
+            for shard, shard_version in zip(self._shards, version):
+                state.update(shard.get_version(shard_version))
+        return state
+
+    def update_version(self, version: tuple) -> None:
+        """Обновляет текущие версии всех шардов до указанной глобальной версии.
+
+        :param version: Глобальная версия (кортеж версий шардов)
+        :raises ValueError: Если версия не существует
+        """
+        self._check_version(version)
+        with self._all_locks():
+            for shard, shard_version in zip(self._shards, version):
+                if shard_version < 0 or shard_version > shard._last_state:
+                    raise ValueError(f'Version "{version}" does not exist')
+            for shard, shard_version in zip(self._shards, version):
+                shard.update_version(shard_version)
+
+    def get_shard_count(self) -> int:
+        """Возвращает количество шардов.
+
+        :return: Количество шардов.
+        """
+        return len(self._shards)
+
+    def __getstate__(self) -> dict:
+        """Возвращает состояние для сериализации без блокировок."""
+        state = self.__dict__.copy()
+        del state['_locks']
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        """Восстанавливает состояние после десериализации и создает блокировки заново."""
+        self.__dict__.update(state)
+        self._locks = [threading.Lock() for _ in self._shards]
+
+    def _shard_index(self, key: any) -> int:
+        """Возвращает номер шарда для ключа."""
+        return _stable_hash(key) % len(self._shards)
+
+    def _check_version(self, version: tuple) -> None:
+        """Проверяет, что глобальная версия содержит по одной версии на каждый шард."""
+        if len(version) != len(self._shards):
+            raise ValueError(f'Version "{version}" does not exist')
+
+    def _all_locks(self) -> '_AllLocks':
+        """Возвращает контекстный менеджер, захватывающий блокировки всех шардов по порядку."""
+        return _AllLocks(self._locks)
+
+
+class _AllLocks:
+    """Контекстный менеджер для захвата нескольких блокировок в фиксированном порядке."""
+
+    def __init__(self, locks: list) -> None:
+        self._locks = locks
+
+    def __enter__(self) -> None:
+        for lock in self._locks:
+            lock.acquire()
+
+    def __exit__(self, *exc_info) -> None:
+        for lock in reversed(self._locks):
+            lock.release()
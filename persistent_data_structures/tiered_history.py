@@ -0,0 +1,238 @@
+import lzma
+import os
+import pickle
+import shutil
+import tempfile
+import time
+import weakref
+import zlib
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+CODECS = {
+    'zlib': (zlib.compress, zlib.decompress),
+    'lzma': (lzma.compress, lzma.decompress),
+}
+
+
+class TieredHistory(MutableMapping):
+    """История версий с горячим уровнем в памяти и холодным уровнем на диске.
+
+    Последние версии хранятся в памяти. Когда горячих версий накапливается на segment_size
+    больше hot_versions (или их объем, оцененный функцией sizer, превышает max_hot_bytes),
+    самые старые из них группами по segment_size версий сериализуются, сжимаются
+    и записываются в сегмент на диске. Последняя версия всегда остается в памяти.
+    При обращении к холодной версии ее сегмент загружается в ограниченный LRU-кеш
+    из cache_size сегментов. Для каждой операции ведутся метрики попаданий и задержки загрузки.
+
+    Каждая история записывает сегменты в собственную поддиректорию внутри directory, поэтому
+    несколько историй (в том числе после перезапуска) не перезаписывают сегменты друг друга.
+    Поддиректория удаляется методом close(), а также при удалении истории сборщиком мусора
+    или завершении интерпретатора.
+    """
+
+    SEGMENT_PREFIX = 'segment-'
+    SEGMENT_SUFFIX = '.bin'
+
+    def __init__(self, directory: str, history: dict = None, hot_versions: int = 256,
+                 segment_size: int = 64, cache_size: int = 4, codec: str = 'zlib',
+                 max_hot_bytes: int = None, sizer: callable = None) -> None:
+        """Создает историю версий с вытеснением старых версий на диск.
+
+        :param directory: Директория, в которой создается поддиректория для сегментов
+            холодных версий.
+        :param history: Начальная история версий (словарь номер версии - состояние).
+        :param hot_versions: Количество последних версий, хранящихся в памяти, если их
+            объем не превышает max_hot_bytes.
+        :param segment_size: Количество версий в одном сегменте на диске.
+        :param cache_size: Количество сегментов в кеше загруженных холодных версий.
+        :param codec: Алгоритм сжатия сегментов: 'zlib' или 'lzma'.
+        :param max_hot_bytes: Приблизительный предельный объем горячих версий в байтах
+            (по умолчанию не ограничен).
+        :param sizer: Функция, оценивающая объем состояния версии в байтах
+            (по умолчанию estimate_size).
+        :raises ValueError: Если параметры заданы неверно.
+        """
+        if codec not in CODECS:
+            raise ValueError(f'Codec "{codec}" does not exist')
+        if hot_versions < 1 or segment_size < 1 or cache_size < 1:
+            raise ValueError('hot_versions, segment_size and cache_size must be positive')
+        self.directory = directory
+        self.hot_versions = hot_versions
+        self.segment_size = segment_size
+        self.cache_size = cache_size
+        self.codec = codec
+        self.max_hot_bytes = max_hot_bytes
+        self._sizer = sizer or estimate_size
+        self._open()
+        self._hot = {}
+        self._hot_sizes = {}
+        self._hot_bytes = 0
+        self._cold = {}
+        self._segments = 0
+        self._hot_hits = 0
+        self._cache_hits = 0
+        self._faults = 0
+        self._fault_time = 0.0
+        self._max_fault_time = 0.0
+        for version, state in (history or {}).items():
+            self[version] = state
+
+    def __getitem__(self, version: int) -> any:
+        if version in self._hot:
+            self._hot_hits += 1
+            return self._hot[version]
+        segment = self._cold[version]
+        if segment in self._cache:
+            self._cache_hits += 1
+            self._cache.move_to_end(segment)
+        else:
+            self._fault(segment)
+        return self._cache[segment][version]
+
+    def __setitem__(self, version: int, state: any) -> None:
+        if version in self._hot:
+            self._hot_bytes -= self._hot_sizes[version]
+        self._cold.pop(version, None)
+        self._hot[version] = state
+        self._hot_sizes[version] = self._sizer(state)
+        self._hot_bytes += self._hot_sizes[version]
+        self._evict()
+
+    def __delitem__(self, version: int) -> None:
+        if version in self._hot:
+            del self._hot[version]
+            self._hot_bytes -= self._hot_sizes.pop(version)
+        else:
+            del self._cold[version]
+
+    def __contains__(self, version: int) -> bool:
+        return version in self._hot or version in self._cold
+
+    def __iter__(self):
+        yield from sorted(self._cold)
+        yield from list(self._hot)
+
+    def __len__(self) -> int:
+        return len(self._hot) + len(self._cold)
+
+    def __getstate__(self) -> dict:
+        """Возвращает состояние для сериализации.
+
+        Горячие версии сериализуются как есть, а холодные - сжатым содержимым их сегментов,
+        без распаковки. Функция оценки объема и кеш не сохраняются.
+        """
+        state = self.__dict__.copy()
+        for name in ('path', '_finalizer', '_compress', '_decompress', '_sizer', '_cache'):
+            del state[name]
+        segments = {}
+        for segment in set(self._cold.values()):
+            with open(self._segment_path(segment), 'rb') as file:
+                segments[segment] = file.read()
+        state['_segment_data'] = segments
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        """Восстанавливает историю и записывает ее сегменты в новую поддиректорию."""
+        segments = state.pop('_segment_data')
+        self.__dict__.update(state)
+        self._sizer = estimate_size
+        self._open()
+        for segment, data in segments.items():
+            with open(self._segment_path(segment), 'wb') as file:
+                file.write(data)
+
+    def in_memory(self, version: int) -> bool:
+        """Проверяет, хранится ли версия на горячем уровне в памяти.
+
+        :param version: Номер версии.
+        :return: True, если версия горячая, иначе False.
+        """
+        return version in self._hot
+
+    def close(self) -> None:
+        """Удаляет сегменты холодных версий с диска.
+
+        После закрытия в истории остаются только горячие версии.
+        """
+        self._finalizer()
+        self._cold.clear()
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        """Возвращает метрики обращений к истории.
+
+        :return: Словарь с количеством горячих и холодных версий, числом попаданий в память
+            и в кеш, числом загрузок с диска, долей попаданий и задержкой загрузки в секундах.
+        """
+        reads = self._hot_hits + self._cache_hits + self._faults
+        return {
+            'hot_versions': len(self._hot),
+            'cold_versions': len(self._cold),
+            'hot_bytes': self._hot_bytes,
+            'hot_hits': self._hot_hits,
+            'cache_hits': self._cache_hits,
+            'faults': self._faults,
+            'hit_rate': (self._hot_hits + self._cache_hits) / reads if reads else 1.0,
+            'avg_fault_latency': self._fault_time / self._faults if self._faults else 0.0,
+            'max_fault_latency': self._max_fault_time,
+        }
+
+    def _open(self) -> None:
+        """Создает поддиректорию для сегментов, кеш и функции сжатия."""
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = tempfile.mkdtemp(prefix='history-', dir=self.directory)
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.path, ignore_errors=True)
+        self._compress, self._decompress = CODECS[self.codec]
+        self._cache = OrderedDict()
+
+    def _evict(self) -> None:
+        """Вытесняет самые старые горячие версии в сегменты на диске."""
+        while len(self._hot) > 1 and (
+                len(self._hot) >= self.hot_versions + self.segment_size
+                or (self.max_hot_bytes is not None and self._hot_bytes > self.max_hot_bytes)):
+            count = min(self.segment_size, len(self._hot) - 1)
+            versions = list(self._hot)[:count]
+            self._write_segment({version: self._hot[version] for version in versions})
+            for version in versions:
+                del self._hot[version]
+                self._hot_bytes -= self._hot_sizes.pop(version)
+
+    def _write_segment(self, states: dict) -> None:
+        """Сжимает и записывает версии в новый сегмент на диске."""
+        self._segments += 1
+        data = self._compress(pickle.dumps(states, protocol=pickle.HIGHEST_PROTOCOL))
+        with open(self._segment_path(self._segments), 'wb') as file:
+            file.write(data)
+        for version in states:
+            self._cold[version] = self._segments
+
+    def _fault(self, segment: int) -> None:
+        """Загружает сегмент с диска в кеш, вытесняя из кеша давно не использованный сегмент."""
+        start = time.perf_counter()
+        with open(self._segment_path(segment), 'rb') as file:
+            states = pickle.loads(self._decompress(file.read()))
+        elapsed = time.perf_counter() - start
+        self._faults += 1
+        self._fault_time += elapsed
+        self._max_fault_time = max(self._max_fault_time, elapsed)
+        self._cache[segment] = states
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _segment_path(self, segment: int) -> str:
+        """Возвращает путь сегмента с указанным номером."""
+        return os.path.join(self.path, f'{self.SEGMENT_PREFIX}{segment:06d}{self.SEGMENT_SUFFIX}')
+
+
+def estimate_size(state: any) -> int:
+    """Приблизительно оценивает объем состояния в памяти.
+
+    Для массивов NumPy учитывается объем данных, для остальных объектов - размер
+    сериализованного состояния со всеми вложенными объектами.
+    :param state: Состояние версии.
+    :return: Оценка объема в байтах.
+    """
+    if hasattr(state, 'nbytes'):
+        return state.nbytes
+    return len(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL))
@@ -1,6 +1,9 @@
+import operator
+
 import pytest
 
 from persistent_array import PersistentArray
+from segment_tree import Monoid
 
 
 # Тестирование методов класса PersistentArray
@@ -116,3 +119,70 @@ def test_invalid_version_update(persistent_array):
     persistent_array.add(2)
     with pytest.raises(ValueError):
         persistent_array.update_version(10)
+
+
+def test_version_equal(persistent_array):
+    """Тест 14. Проверка сравнения версий по структурному хешу"""
+    persistent_array[0] = 5
+    persistent_array.add(1)
+    persistent_array.pop(5)
+    persistent_array[0] = 0
+    assert persistent_array.version_equal(0, 4)
+    assert persistent_array.version_equal(1, 3)
+    assert not persistent_array.version_equal(0, 1)
+    assert persistent_array == PersistentArray(size=5, default_value=0)
+
+
+def test_deduplication(persistent_array):
+    """Тест 15. Проверка хранения одинаковых версий в единственном экземпляре"""
+    persistent_array.enable_deduplication()
+    persistent_array[0] = 5
+    persistent_array[0] = 0
+    persistent_array[0] = 5
+    assert persistent_array.get_version(2) is persistent_array.get_version(0)
+    assert persistent_array.get_version(3) is persistent_array.get_version(1)
+    persistent_array[1] = 6
+    assert list(persistent_array.get_version(1)) == [5, 0, 0, 0, 0]
+
+
+def test_range_query():
+    """Тест 16. Проверка агрегатов на отрезке для разных версий массива"""
+    persistent_array = PersistentArray(size=5, default_value=1, aggregates=['sum', 'min', 'max'])
+    persistent_array[2] = 10
+    persistent_array.insert(0, -3)
+    persistent_array.add(7)
+    persistent_array.pop(1)
+    assert persistent_array.range_query(0, 0, 5) == 5
+    assert persistent_array.range_query(1, 1, 4, 'max') == 10
+    assert persistent_array.range_query(2, 0, 6, 'min') == -3
+    assert persistent_array.range_query(3, 0, 7) == 18
+    assert persistent_array.range_query(4, 0, 6) == 17
+    assert persistent_array.range_query(4, 2, 2) == 0
+
+
+def test_range_query_custom_monoid():
+    """Тест 17. Проверка агрегата пользовательского моноида и ошибок запроса"""
+    product = Monoid('product', operator.mul, 1)
+    persistent_array = PersistentArray(size=3, default_value=2, aggregates=[product])
+    persistent_array[0] = 5
+    assert persistent_array.range_query(1, 0, 3, product) == 20
+    with pytest.raises(ValueError):
+        persistent_array.range_query(1, 0, 3, 'sum')
+    with pytest.raises(ValueError, match='must be picklable'):
+        Monoid('product', lambda first, second: first * second, 1)
+    with pytest.raises(ValueError):
+        persistent_array.range_query(1, 0, 4, 'product')
+    with pytest.raises(ValueError):
+        PersistentArray(size=3).range_query(0, 0, 1)
+
+
+def test_version_equal_hash_collision():
+    """Тест 18. Сравнение версий с элементами, у которых совпадают встроенные хеши Python"""
+    persistent_array = PersistentArray(size=3)
+    persistent_array[0] = -1
+    persistent_array[0] = -2
+    persistent_array[0] = 2 ** 61 - 2
+    assert hash(-1) == hash(-2)
+    assert not persistent_array.version_equal(1, 2)
+    assert persistent_array.version_hash(1) != persistent_array.version_hash(2)
+    assert not persistent_array.version_equal(0, 3)
@@ -0,0 +1,170 @@
+import os
+import pickle
+import time
+
+import pytest
+
+from journal import Journal
+from persistent_array import PersistentArray
+from persistent_list import PersistentLinkedList
+from persistent_map import PersistentMap
+
+
+# Тестирование журнала операций
+@pytest.fixture
+def journal_dir(tmp_path):
+    """Фикстура для создания директории журнала"""
+    return str(tmp_path / 'journal')
+
+
+def test_recover_map(journal_dir):
+    """Тест 1. Восстановление ассоциативного массива из снимка и журнала"""
+    persistent_map = PersistentMap({'a': 1})
+    persistent_map.attach_journal(Journal(journal_dir, group_commit=2))
+    persistent_map['b'] = 2
+    persistent_map.pop('a')
+    persistent_map.update_version(1)
+    persistent_map['c'] = 3
+    persistent_map._journal.close()
+
+    recovered = Journal.recover(journal_dir)
+    assert recovered._history == persistent_map._history
+    assert recovered._current_state == persistent_map._current_state
+
+
+def test_recover_array(journal_dir):
+    """Тест 2. Восстановление массива из снимка и журнала"""
+    persistent_array = PersistentArray(size=3, default_value=0)
+    persistent_array.attach_journal(Journal(journal_dir))
+    persistent_array.add(5)
+    persistent_array[0] = 7
+    persistent_array.insert(1, 9)
+    persistent_array.remove(2)
+    persistent_array._journal.close()
+
+    recovered = Journal.recover(journal_dir)
+    assert recovered.get_size() == persistent_array.get_size()
+    for version in range(persistent_array._last_state + 1):
+        assert list(recovered.get_version(version)) == list(persistent_array.get_version(version))
+
+
+def test_recover_failed_operation(journal_dir):
+    """Тест 3. Повтор операции, завершившейся ошибкой, дает то же состояние"""
+    linked_list = PersistentLinkedList([1, 2, 3])
+    linked_list.attach_journal(Journal(journal_dir))
+    linked_list.add(4)
+    with pytest.raises(IndexError):
+        linked_list.insert(10, 0)
+    linked_list.add_first(0)
+    linked_list._journal.close()
+
+    recovered = Journal.recover(journal_dir)
+    assert recovered._last_state == linked_list._last_state
+    assert [recovered[i] for i in range(5)] == [0, 1, 2, 3, 4]
+
+
+def test_torn_record_is_ignored(journal_dir):
+    """Тест 4. Оборванная последняя запись журнала игнорируется при восстановлении"""
+    persistent_map = PersistentMap({})
+    journal = Journal(journal_dir)
+    persistent_map.attach_journal(journal)
+    persistent_map['a'] = 1
+    persistent_map['b'] = 2
+    journal.close()
+    segment = journal._segments()[-1]
+    with open(segment, 'r+b') as file:
+        file.truncate(os.path.getsize(segment) - 1)
+
+    recovered = Journal.recover(journal_dir)
+    assert recovered['a'] == 1
+    assert 'b' not in recovered._history[recovered._current_state]
+
+
+def test_compact(journal_dir):
+    """Тест 5. Сжатие журнала в снимок удаляет учтенные сегменты"""
+    persistent_map = PersistentMap({})
+    journal = Journal(journal_dir)
+    persistent_map.attach_journal(journal)
+    for i in range(10):
+        persistent_map[i] = i
+    journal.compact(persistent_map, background=True).join()
+    persistent_map['x'] = 'y'
+    journal.close()
+
+    assert len(journal._segments()) == 1
+    recovered = Journal.recover(journal_dir)
+    assert recovered._history == persistent_map._history
+
+
+def test_invalid_group_commit(journal_dir):
+    """Тест 6. Проверка на исключение для недопустимого размера группы"""
+    with pytest.raises(ValueError):
+        Journal(journal_dir, group_commit=0)
+
+
+def test_failed_operations_not_logged(journal_dir):
+    """Тест 7. Операции, завершившиеся ошибкой, не изменяют структуру и не записываются"""
+    persistent_array = PersistentArray(size=3, default_value=0)
+    journal = Journal(journal_dir)
+    persistent_array.attach_journal(journal)
+    with pytest.raises(ValueError):
+        persistent_array[0] = 'x'
+    with pytest.raises(ValueError):
+        persistent_array.insert(0, [1, 2])
+    persistent_array[1] = 5
+    journal.append('renamed_method', ())
+    journal.close()
+
+    assert persistent_array._last_state == 1
+    with pytest.raises(AttributeError):
+        Journal.recover(journal_dir)
+
+
+def test_sync_commit(journal_dir):
+    """Тест 8. При sync_commit запись сохранена на диске к возврату из операции"""
+    persistent_map = PersistentMap({})
+    journal = Journal(journal_dir, group_commit=64, sync_commit=True, flush_interval=None)
+    persistent_map.attach_journal(journal)
+    persistent_map['a'] = 1
+
+    records = list(journal._read_records(journal._segments()[-1]))
+    assert [pickle.loads(payload) for _, payload in records] == [('__setitem__', ('a', 1))]
+    journal.close()
+
+
+def test_flush_interval(journal_dir):
+    """Тест 9. Неполная группа записей сбрасывается на диск по истечении интервала"""
+    persistent_map = PersistentMap({})
+    journal = Journal(journal_dir, group_commit=64, flush_interval=0.01)
+    persistent_map.attach_journal(journal)
+    persistent_map['a'] = 1
+    time.sleep(0.2)
+
+    assert os.path.getsize(journal._segments()[-1]) > 0
+    journal.close()
+
+
+def test_invalid_flush_interval(journal_dir):
+    """Тест 10. Проверка на исключение для недопустимого интервала сброса"""
+    with pytest.raises(ValueError):
+        Journal(journal_dir, flush_interval=0)
+
+
+def test_concurrent_compactions(journal_dir):
+    """Тест 11. Одновременные фоновые сжатия не теряют записи журнала"""
+    persistent_map = PersistentMap({})
+    journal = Journal(journal_dir)
+    persistent_map.attach_journal(journal)
+    threads = []
+    for i in range(20):
+        for j in range(3):
+            persistent_map[(i, j)] = i
+            threads.append(journal.compact(persistent_map, background=True))
+    for thread in threads:
+        thread.join()
+    persistent_map['x'] = 'y'
+    journal.close()
+
+    assert journal._snapshot_lsn == 60
+    recovered = Journal.recover(journal_dir)
+    assert recovered._history == persistent_map._history
@@ -95,3 +95,36 @@ def test_check_is_empty(linked_list):
     assert linked_list.check_is_empty() is True
     linked_list.add(10)
     assert linked_list.check_is_empty() is False
+
+
+def test_pop_keeps_previous_version(linked_list):
+    """Тест 12. Проверка, что удаление не изменяет предыдущую версию"""
+    linked_list.pop(0)
+    linked_list.remove(3)
+    assert [linked_list.get(0, i) for i in range(5)] == [1, 2, 3, 4, 5]
+    assert [linked_list.get(1, i) for i in range(4)] == [2, 3, 4, 5]
+    linked_list.update_version(0)
+    assert linked_list.get_size() == 5
+
+
+def test_version_equal(linked_list):
+    """Тест 13. Проверка сравнения версий по структурному хешу"""
+    linked_list.add_first(0)
+    linked_list.pop(0)
+    linked_list[1] = 7
+    linked_list[1] = 2
+    assert linked_list.version_equal(0, 2)
+    assert linked_list.version_equal(0, 4)
+    assert not linked_list.version_equal(0, 3)
+    assert linked_list == PersistentLinkedList([1, 2, 3, 4, 5])
+
+
+def test_failed_operation_keeps_versions(linked_list):
+    """Тест 14. Операция с недопустимым индексом не создает новую версию"""
+    with pytest.raises(IndexError):
+        linked_list.insert(10, 0)
+    with pytest.raises(IndexError):
+        linked_list[10] = 0
+    assert linked_list._last_state == 0
+    linked_list.insert(0, 0)
+    assert [linked_list[i] for i in range(6)] == [0, 1, 2, 3, 4, 5]
@@ -1,6 +1,8 @@
+from copy import deepcopy
+
 import pytest
 
-from persistent_map import PersistentMap
+from persistent_map import DELETED, FlatMap, PersistentMap
 
 
 # Тестирование методов класса PersistentMap
@@ -81,3 +83,166 @@ def test_version_history(persistent_map):
     assert persistent_map.get_version(0) == {'a': 1, 'b': 2}
     assert persistent_map.get_version(1) == {'a': 1, 'b': 2, 'c': 3}
     assert persistent_map.get_version(2) == {'a': 1, 'b': 2, 'c': 3, 'd': 4}
+
+
+def test_get_value(persistent_map):
+    """Тест 11. Проверка получения значения ключа в указанной версии"""
+    persistent_map['a'] = 10
+    persistent_map.pop('b')
+    assert persistent_map.get(0, 'a') == 1
+    assert persistent_map.get(1, 'a') == 10
+    assert persistent_map.get(1, 'b') == 2
+    with pytest.raises(KeyError, match='Key "b" does not exist'):
+        persistent_map.get(2, 'b')
+
+
+def test_key_history(persistent_map):
+    """Тест 12. Проверка истории изменений ключа и версии последнего изменения"""
+    persistent_map['a'] = 10
+    persistent_map['c'] = 3
+    persistent_map.pop('a')
+    persistent_map['a'] = 20
+    assert persistent_map.key_history('a') == [(0, 1), (1, 10), (3, DELETED), (4, 20)]
+    assert persistent_map.last_modified('a') == 4
+    assert persistent_map.last_modified('a', 2) == 1
+    assert persistent_map.last_modified('b') == 0
+    with pytest.raises(KeyError):
+        persistent_map.last_modified('d')
+
+
+def test_key_history_branches(persistent_map):
+    """Тест 13. Проверка индекса изменений ключа при ветвлении версий"""
+    persistent_map['a'] = 10
+    persistent_map['a'] = 20
+    persistent_map.update_version(1)
+    persistent_map['b'] = 30
+    assert persistent_map.get(3, 'a') == 10
+    assert persistent_map.last_modified('a') == 1
+    assert persistent_map.key_history('a') == [(0, 1), (1, 10)]
+    assert persistent_map.key_history('a', 2) == [(0, 1), (1, 10), (2, 20)]
+
+
+def test_get_many(persistent_map):
+    """Тест 14. Проверка получения значений ключа для нескольких версий"""
+    persistent_map['c'] = 3
+    persistent_map.clear()
+    persistent_map['c'] = 4
+    assert persistent_map.get_many([0, 1, 2, 3], 'c') == [None, 3, None, 4]
+    assert persistent_map.get_many([3, 0], 'a', default=-1) == [-1, 1]
+
+
+def test_version_equal(persistent_map):
+    """Тест 15. Проверка сравнения версий по структурному хешу"""
+    persistent_map['c'] = [1, 2]
+    persistent_map.pop('c')
+    persistent_map['a'] = 1
+    assert persistent_map.version_equal(0, 2)
+    assert persistent_map.version_equal(2, 3)
+    assert not persistent_map.version_equal(0, 1)
+    assert persistent_map == PersistentMap({'b': 2, 'a': 1})
+    assert persistent_map != PersistentMap({'a': 1})
+
+
+def test_adaptive_storage():
+    """Тест 16. Проверка смены представления версий в адаптивном режиме"""
+    persistent_map = PersistentMap({'a': 1}, storage='adaptive',
+                                   promote_threshold=3, demote_threshold=2)
+    assert isinstance(persistent_map.get_version(0), FlatMap)
+    for key in 'bcd':
+        persistent_map[key] = key
+    assert isinstance(persistent_map.get_version(2), FlatMap)
+    assert isinstance(persistent_map.get_version(3), dict)
+    persistent_map.pop('d')
+    assert isinstance(persistent_map.get_version(4), dict)
+    persistent_map.pop('c')
+    assert isinstance(persistent_map.get_version(5), FlatMap)
+    assert persistent_map.get_version(5) == {'a': 1, 'b': 'b'}
+    assert persistent_map.get(3, 'd') == 'd'
+    assert persistent_map.version_equal(1, 5)
+
+
+def test_flat_storage():
+    """Тест 17. Проверка операций над версиями в представлении FlatMap"""
+    persistent_map = PersistentMap({'a': 1, 'b': 2}, storage='flat')
+    persistent_map['a'] = 3
+    assert persistent_map['a'] == 3
+    assert persistent_map.get(0, 'a') == 1
+    with pytest.raises(KeyError):
+        persistent_map.pop('c')
+    persistent_map.clear()
+    assert persistent_map.get_version(persistent_map._last_state) == {}
+
+
+def test_invalid_storage():
+    """Тест 18. Проверка на исключение для недопустимого представления"""
+    with pytest.raises(ValueError, match='Storage "tree" does not exist'):
+        PersistentMap({}, storage='tree')
+    with pytest.raises(ValueError):
+        PersistentMap({}, storage='adaptive', promote_threshold=4, demote_threshold=8)
+
+
+def test_get_after_update_version(persistent_map):
+    """Тест 19. Получение элемента версии, созданной после текущей"""
+    persistent_map['a'] = 10
+    persistent_map.update_version(0)
+    assert persistent_map.get(1, 'a') == 10
+    with pytest.raises(ValueError):
+        persistent_map.get(2, 'a')
+
+
+def test_long_sibling_branch(persistent_map):
+    """Тест 20. Поиск изменений ключа не просматривает изменения соседней ветви"""
+    for i in range(1000):
+        persistent_map['a'] = i
+    persistent_map.update_version(0)
+    persistent_map['c'] = 3
+    fork = persistent_map._last_state
+    persistent_map['a'] = -1
+    assert persistent_map.get(fork, 'a') == 1
+    assert persistent_map.last_modified('a', fork) == 0
+    assert persistent_map.key_history('a') == [(0, 1), (fork + 1, -1)]
+    assert persistent_map.get(1000, 'a') == 999
+    assert persistent_map._find_change(fork, 'a') == (0, 0)
+
+
+def test_version_equal_hash_collision(persistent_map):
+    """Тест 21. Сравнение версий со значениями, у которых совпадают встроенные хеши Python"""
+    persistent_map['a'] = -1
+    persistent_map['a'] = -2
+    assert not persistent_map.version_equal(1, 2)
+    persistent_map['a'] = 1.0
+    assert persistent_map.version_equal(0, 3)
+    persistent_map.enable_deduplication()
+    persistent_map['a'] = -1
+    assert persistent_map.get_version(4) is persistent_map.get_version(1)
+
+
+def test_pop_missing_key_keeps_versions(persistent_map):
+    """Тест 22. Удаление несуществующего ключа не создает новую версию"""
+    with pytest.raises(KeyError):
+        persistent_map.pop('c')
+    assert persistent_map._last_state == 0
+
+
+def test_unhashable_key(persistent_map):
+    """Тест 23. Нехешируемый ключ отклоняется до создания новой версии"""
+    with pytest.raises(TypeError):
+        persistent_map[[1]] = 2
+    assert persistent_map._last_state == 0
+    flat_map = FlatMap({'a': 1})
+    with pytest.raises(TypeError):
+        flat_map[[1]] = 2
+    assert flat_map == {'a': 1}
+
+
+def test_flat_map_layout():
+    """Тест 24. Ключи и значения FlatMap хранятся в одном кортеже, который разделяют копии"""
+    flat_map = FlatMap({'a': 1, 'b': 2})
+    assert flat_map._items == ('a', 1, 'b', 2)
+    copy = deepcopy(flat_map)
+    assert copy._items is flat_map._items
+    copy['a'] = 3
+    del copy['b']
+    assert copy._items == ('a', 3)
+    assert flat_map == {'a': 1, 'b': 2}
+    assert 1 not in flat_map
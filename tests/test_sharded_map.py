@@ -0,0 +1,86 @@
+import os
+import pickle
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from sharded_map import ShardedPersistentMap
+
+
+# Тестирование методов класса ShardedPersistentMap
+@pytest.fixture
+def sharded_map():
+    """Фикстура для создания ShardedPersistentMap"""
+    return ShardedPersistentMap({'a': 1, 'b': 2}, shards=4)
+
+
+def test_setitem_getitem(sharded_map):
+    """Тест 1. Проверка обновления и получения элементов"""
+    sharded_map['c'] = 3
+    sharded_map['a'] = 10
+    assert sharded_map['a'] == 10
+    assert sharded_map['b'] == 2
+    assert sharded_map['c'] == 3
+
+
+def test_snapshot(sharded_map):
+    """Тест 2. Проверка получения состояния по глобальной версии"""
+    version = sharded_map.snapshot()
+    sharded_map['a'] = 10
+    sharded_map.pop('b')
+    assert sharded_map.get(version, 'a') == 1
+    assert sharded_map.get_version(version) == {'a': 1, 'b': 2}
+    assert sharded_map.get_version(sharded_map.snapshot()) == {'a': 10}
+    with pytest.raises(KeyError, match='Key "b" does not exist'):
+        sharded_map.get(sharded_map.snapshot(), 'b')
+
+
+def test_update_version(sharded_map):
+    """Тест 3. Проверка обновления текущей глобальной версии"""
+    version = sharded_map.snapshot()
+    sharded_map.clear()
+    sharded_map.update_version(version)
+    assert sharded_map['a'] == 1
+    with pytest.raises(ValueError):
+        sharded_map.update_version((0, 0))
+
+
+def test_parallel_writes(sharded_map):
+    """Тест 4. Проверка записи из нескольких потоков"""
+    def write(thread):
+        for i in range(100):
+            sharded_map[(thread, i)] = i
+
+    threads = [threading.Thread(target=write, args=(thread,)) for thread in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    state = sharded_map.get_version(sharded_map.snapshot())
+    assert len(state) == 402
+    assert sum(sharded_map._shards[i]._last_state for i in range(4)) == 400
+
+
+def test_invalid_shards():
+    """Тест 5. Проверка на исключение для недопустимого количества шардов"""
+    with pytest.raises(ValueError):
+        ShardedPersistentMap({}, shards=0)
+
+
+def test_pickle_other_process(tmp_path):
+    """Тест 6. Ключи находятся в своих шардах после загрузки в другом процессе"""
+    sharded_map = ShardedPersistentMap({('x', 'y'): 1, 'z': 2, 3.0: 3}, shards=8)
+    path = tmp_path / 'map.pickle'
+    path.write_bytes(pickle.dumps(sharded_map))
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    python_path = os.pathsep.join([root, os.path.join(root, 'persistent_data_structures')])
+    script = ('import pickle, sys\n'
+              'sharded_map = pickle.loads(open(sys.argv[1], "rb").read())\n'
+              'print(sharded_map[("x", "y")], sharded_map["z"], sharded_map[3])\n')
+    for seed in ('1', '2', '3'):
+        env = dict(os.environ, PYTHONHASHSEED=seed, PYTHONPATH=python_path)
+        result = subprocess.run([sys.executable, '-c', script, str(path)], env=env,
+                                capture_output=True, text=True, check=True)
+        assert result.stdout.split() == ['1', '2', '3']
@@ -0,0 +1,168 @@
+import os
+import pickle
+
+import pytest
+
+from journal import Journal
+from persistent_array import PersistentArray
+from persistent_list import PersistentLinkedList
+from persistent_map import PersistentMap
+from tiered_history import TieredHistory
+
+
+# Тестирование многоуровневого хранения истории версий
+@pytest.fixture
+def tiered_map(tmp_path):
+    """Фикстура для создания PersistentMap с вытеснением версий на диск"""
+    persistent_map = PersistentMap({'a': 0})
+    persistent_map.enable_tiered_storage(str(tmp_path), hot_versions=4, segment_size=3,
+                                         cache_size=1)
+    for i in range(1, 20):
+        persistent_map['a'] = i
+    return persistent_map
+
+
+def test_eviction(tiered_map):
+    """Тест 1. Проверка вытеснения старых версий на диск"""
+    stats = tiered_map.storage_stats()
+    assert stats['hot_versions'] < 4 + 3
+    assert stats['hot_versions'] + stats['cold_versions'] == 20
+
+
+def test_fault_in(tiered_map):
+    """Тест 2. Проверка загрузки вытесненных версий с диска"""
+    assert tiered_map.get_version(0) == {'a': 0}
+    assert tiered_map.get_version(1) == {'a': 1}
+    assert tiered_map.get_version(19) == {'a': 19}
+    stats = tiered_map.storage_stats()
+    assert stats['faults'] == 1
+    assert stats['cache_hits'] == 1
+    assert stats['max_fault_latency'] > 0
+
+
+def test_update_old_version(tiered_map):
+    """Тест 3. Проверка создания новой версии от вытесненной версии"""
+    tiered_map.update_version(2)
+    tiered_map['b'] = 1
+    assert tiered_map.get_version(20) == {'a': 2, 'b': 1}
+    assert tiered_map['a'] == 2
+
+
+def test_memory_budget(tmp_path):
+    """Тест 4. Проверка вытеснения версий при превышении объема памяти"""
+    persistent_array = PersistentArray(size=10, default_value=0)
+    persistent_array.enable_tiered_storage(str(tmp_path), hot_versions=100, codec='lzma',
+                                           max_hot_bytes=400)
+    for i in range(10):
+        persistent_array[i] = i
+    assert persistent_array.storage_stats()['hot_bytes'] <= 400
+    assert list(persistent_array.get_version(3)) == [0, 1, 2, 0, 0, 0, 0, 0, 0, 0]
+
+
+def test_pickle(tiered_map):
+    """Тест 5. Проверка сериализации истории без загрузки вытесненных версий"""
+    data = pickle.dumps(tiered_map)
+    assert tiered_map.storage_stats()['faults'] == 0
+    restored = pickle.loads(data)
+    assert restored.storage_stats()['faults'] == 0
+    assert restored.version_hash(0) == tiered_map.version_hash(0)
+    assert restored._history.path != tiered_map._history.path
+    assert restored.storage_stats()['cold_versions'] == tiered_map.storage_stats()['cold_versions']
+    assert restored.get_version(0) == {'a': 0}
+    assert len(restored._history) == 20
+    restored['a'] = 20
+    assert restored.get_version(20) == {'a': 20}
+
+
+def test_invalid_codec(tmp_path):
+    """Тест 6. Проверка на исключение для недопустимого алгоритма сжатия"""
+    with pytest.raises(ValueError, match='Codec "gzip" does not exist'):
+        TieredHistory(str(tmp_path), codec='gzip')
+    assert PersistentMap({}).storage_stats() is None
+
+
+def test_memory_budget_list(tmp_path):
+    """Тест 7. Проверка объема горячих версий списка с учетом всех узлов"""
+    linked_list = PersistentLinkedList(list(range(100)))
+    linked_list.enable_tiered_storage(str(tmp_path), hot_versions=100, max_hot_bytes=100_000)
+    for i in range(50):
+        linked_list.add(i)
+    stats = linked_list.storage_stats()
+    assert stats['hot_bytes'] <= 100_000
+    assert stats['hot_versions'] < 5
+    assert linked_list.get(0, 99) == 99
+
+
+def test_memory_budget_flat_map(tmp_path):
+    """Тест 8. Проверка объема горячих версий FlatMap с учетом ключей и значений"""
+    persistent_map = PersistentMap({i: i for i in range(500)}, storage='flat')
+    persistent_map.enable_tiered_storage(str(tmp_path), hot_versions=100, max_hot_bytes=100_000)
+    for i in range(50):
+        persistent_map[i] = -i
+    stats = persistent_map.storage_stats()
+    assert stats['hot_bytes'] <= 100_000
+    assert stats['hot_versions'] < 5
+    assert persistent_map.get(0, 1) == 1
+
+
+def test_separate_segment_directories(tmp_path):
+    """Тест 9. Истории в одной директории не перезаписывают сегменты друг друга"""
+    first = PersistentMap({'a': 0})
+    second = PersistentMap({'b': 0})
+    for persistent_map in (first, second):
+        persistent_map.enable_tiered_storage(str(tmp_path), hot_versions=1, segment_size=1)
+    for i in range(1, 5):
+        first['a'] = i
+        second['b'] = -i
+    assert first._history.path != second._history.path
+    assert first.get_version(1) == {'a': 1}
+    assert second.get_version(1) == {'b': -1}
+
+
+def test_close(tiered_map):
+    """Тест 10. Проверка удаления сегментов при отключении многоуровневого хранения"""
+    path = tiered_map._history.path
+    assert os.listdir(path)
+    tiered_map.disable_tiered_storage()
+    assert not os.path.exists(path)
+    assert tiered_map.storage_stats() is None
+    assert tiered_map.get_version(0) == {'a': 0}
+    assert len(tiered_map._history) == 20
+
+
+def test_journal_recover(tiered_map, tmp_path):
+    """Тест 11. Многоуровневое хранение сохраняется после сжатия журнала и восстановления"""
+    journal = Journal(str(tmp_path / 'journal'))
+    tiered_map.attach_journal(journal)
+    tiered_map['a'] = 20
+    journal.close()
+
+    recovered = Journal.recover(str(tmp_path / 'journal'))
+    assert recovered.storage_stats()['faults'] == 0
+    assert recovered.storage_stats()['cold_versions'] > 0
+    assert recovered.get_version(0) == {'a': 0}
+    assert recovered.get_version(20) == {'a': 20}
+
+
+def test_range_query_cold_version(tmp_path):
+    """Тест 12. Запрос на отрезке вытесненной версии не загружает ее с диска"""
+    persistent_array = PersistentArray(size=10, default_value=1, aggregates=['sum'])
+    persistent_array.enable_tiered_storage(str(tmp_path), hot_versions=2, segment_size=2)
+    for i in range(10):
+        persistent_array[i] = 0
+    assert persistent_array.storage_stats()['cold_versions'] > 0
+    assert [persistent_array.range_query(v, 0, 10) for v in range(11)] == list(range(10, -1, -1))
+    with pytest.raises(ValueError):
+        persistent_array.range_query(0, 0, 11)
+    assert persistent_array.storage_stats()['faults'] == 0
+
+
+def test_deduplication_keeps_cold_versions(tiered_map):
+    """Тест 13. Дедупликация не переносит вытесненные версии в память"""
+    cold_versions = tiered_map.storage_stats()['cold_versions']
+    tiered_map.enable_deduplication()
+    tiered_map['a'] = 18
+    stats = tiered_map.storage_stats()
+    assert stats['faults'] == 0
+    assert stats['cold_versions'] >= cold_versions
+    assert tiered_map.get_version(20) is tiered_map.get_version(18)